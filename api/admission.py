@@ -0,0 +1,126 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable, List, Tuple
+
+from metrics.timing import observe, set_gauge, inc_counter
+
+ANSWER_MAX_CONCURRENCY = int(os.getenv("ANSWER_MAX_CONCURRENCY", "4"))
+ANSWER_MAX_QUEUE = int(os.getenv("ANSWER_MAX_QUEUE", "32"))
+ANSWER_QUEUE_TIMEOUT = float(os.getenv("ANSWER_QUEUE_TIMEOUT_SECONDS", "30"))
+
+# X-Request-Priority header -> heap priority (lower runs first)
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounds concurrent calls of an expensive sync function.
+
+    At most `limit` calls run at once, on a dedicated thread pool so they never
+    occupy the event loop or the threadpool that serves cheap endpoints. Up to
+    `max_queue` callers wait in priority order (FIFO within a priority); beyond
+    that, or after `queue_timeout` seconds of waiting, Overloaded is raised
+    with a Retry-After estimate.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=name)
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._service_ewma = 1.0  # seconds, refined as calls complete
+        self._publish()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def _publish(self):
+        set_gauge(f"uidai_{self.name}_queue_depth", self.queued, f"{self.name} requests waiting for a slot")
+        set_gauge(f"uidai_{self.name}_inflight", self._inflight, f"{self.name} requests running")
+
+    def retry_after(self) -> int:
+        backlog = self.queued + self._inflight
+        return max(1, math.ceil(self._service_ewma * backlog / self.limit))
+
+    def _reject(self, reason: str):
+        inc_counter(f"uidai_{self.name}_rejected_total", help=f"{self.name} requests rejected with 429")
+        raise Overloaded(self.retry_after(), reason)
+
+    async def _acquire(self, priority: int):
+        if self._inflight < self.limit and not self.queued:
+            self._inflight += 1
+            return
+        if self.queued >= self.max_queue:
+            self._reject("queue full")
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._publish()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                return  # slot granted just as the timeout fired
+            self._reject("queue timeout")
+        except asyncio.CancelledError:
+            # Client went away; hand the slot on if it had already been granted
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+        finally:
+            self._publish()
+
+    def _release(self):
+        self._inflight -= 1
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self._inflight += 1
+                fut.set_result(None)
+                break
+        self._publish()
+
+    async def run(self, fn: Callable[..., Any], *args, priority: int = PRIORITIES["normal"]) -> Any:
+        t0 = perf_counter()
+        await self._acquire(priority)
+        observe(f"{self.name}_queue_wait", perf_counter() - t0)
+        self._publish()
+        loop = asyncio.get_running_loop()
+        started = perf_counter()
+        # copy_context keeps the request's Server-Timing collection visible in the worker thread
+        job = self._executor.submit(contextvars.copy_context().run, fn, *args)
+
+        # The slot is freed when fn has finished, not when the caller stops
+        # waiting: a client that disconnects cannot stop a thread already running it
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._finished, started)
+            except RuntimeError:
+                pass  # event loop already closed (shutdown)
+
+        job.add_done_callback(done)
+        return await asyncio.wrap_future(job)
+
+    def _finished(self, started: float):
+        self._service_ewma = 0.8 * self._service_ewma + 0.2 * (perf_counter() - started)
+        self._release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import os
+import threading
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from metrics.timing import set_gauge
+
+if TYPE_CHECKING:
+    from llm.memory import AnswerMemory
+
+# Heavy state (search store, answer memory with faiss, the Gemini SDK) is
+# created on first use instead of at import, so a worker imports quickly. The
+# warm-up builds all of it on a background thread right after startup and
+# /healthz reports ready only once it has finished.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+ready = threading.Event()
+warmup_errors: Dict[str, str] = {}
+warmup_seconds: Optional[float] = None
+
+_memory: Optional["AnswerMemory"] = None
+_memory_lock = threading.Lock()
+
+
+def get_memory() -> "AnswerMemory":
+    """The process-wide answer memory, opened (index + metadata loaded) on first use."""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                from llm.memory import AnswerMemory
+
+                _memory = AnswerMemory()
+    return _memory
+
+
+def _llm_client():
+    from llm.gemini_client import LLM_BACKEND, get_genai
+
+    if LLM_BACKEND != "stub":
+        get_genai()
+
+
+def _search_store():
+    from search.store import get_store
+
+    get_store()
+
+
+def _title_index():
+    from search.dense import HYBRID_ENABLED, get_title_index
+
+    if HYBRID_ENABLED:
+        get_title_index()
+
+
+def _suggest_index():
+    from search.suggest import get_suggest_index
+
+    get_suggest_index()
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], object]]] = [
+    ("search_store", _search_store),
+    ("suggest_index", _suggest_index),
+    ("title_index", _title_index),
+    ("answer_memory", get_memory),
+    ("llm_client", _llm_client),
+]
+
+
+def warm_up():
+    """Build everything WARMUP_STEPS lists, then mark the process ready.
+
+    A failing step is logged and skipped (it is retried lazily by the first
+    request that needs it); readiness is still reported so one broken
+    dependency does not keep the whole API out of rotation.
+    """
+    global warmup_seconds
+    t0 = perf_counter()
+    for name, step in WARMUP_STEPS:
+        t = perf_counter()
+        try:
+            step()
+        except Exception as e:
+            warmup_errors[name] = str(e)
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            continue
+        logger.info(f"Warm-up: {name} in {perf_counter() - t:.2f}s")
+    warmup_seconds = perf_counter() - t0
+    set_gauge("uidai_warmup_seconds", warmup_seconds, "time from startup to ready")
+    ready.set()
+
+
+def start_warm_up():
+    if not WARMUP_ENABLED:
+        ready.set()
+        return
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
@@ -0,0 +1,271 @@
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from loguru import logger
+
+from search.store import invalidate as invalidate_search_store
+from search.dense import invalidate as invalidate_title_index
+from search.index_file import _BuildLock
+
+if TYPE_CHECKING:
+    from crawler.pipeline import ScrapeStats
+
+SCHEDULE_ENABLED = os.getenv("SCHEDULE_ENABLED", "false").lower() in ("1", "true", "yes")
+SCHEDULE_CRON_MINUTE = os.getenv("SCHEDULE_CRON_MINUTE", "30")
+SCHEDULE_CRON_HOUR = os.getenv("SCHEDULE_CRON_HOUR", "6")
+SCHEDULE_TIMEZONE = os.getenv("TIMEZONE", "Asia/Kolkata")
+JOB_HISTORY = int(os.getenv("SCRAPE_JOB_HISTORY", "20"))
+JOB_STATE_INTERVAL = float(os.getenv("SCRAPE_JOB_STATE_INTERVAL", "2"))  # seconds between progress saves
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+_scheduler_lock: Optional[_BuildLock] = None
+
+
+def _new_stats() -> "ScrapeStats":
+    # The crawler stack (bs4, parsers, dedup) loads with the first scrape, not at API startup
+    from crawler.pipeline import ScrapeStats
+
+    return ScrapeStats()
+
+
+@dataclass
+class ScrapeJob:
+    id: str
+    trigger: str  # "api" or "schedule"
+    status: str = "queued"  # queued -> running -> succeeded | failed
+    stats: ScrapeStats = field(default_factory=_new_stats)
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            **self.stats.snapshot(),
+            "elapsed_seconds": round(elapsed, 3),
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class ScrapeJobManager:
+    """Runs scrapes on a background thread, one at a time across all API workers.
+
+    The worker running a scrape holds an flock on DATA_DIR/scrape.lock until it
+    finishes, and keeps the job's state in DATA_DIR/scrape_jobs/<id>.json, so any
+    worker (uvicorn --workers N) can report it. Submitting while a scrape is
+    running anywhere returns that job instead of starting a second crawl.
+    """
+
+    def __init__(self, history: int = JOB_HISTORY, data_dir: str = DATA_DIR):
+        self._dir = os.path.join(data_dir, "scrape_jobs")
+        self._run_lock_path = os.path.join(data_dir, "scrape.lock")
+        self._submit_lock_path = os.path.join(data_dir, "scrape_submit.lock")
+        self._history = history
+        self._running: Optional[ScrapeJob] = None  # the job this process runs, with live stats
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape")
+
+    def submit(self, trigger: str = "api") -> Tuple[dict, bool]:
+        # The submit lock makes "is a scrape running, else start one" atomic
+        # across processes; it is only held for these few file operations.
+        submit_lock = self._submit_lock()
+        with submit_lock as locked:
+            if not locked:
+                raise submit_lock.error or OSError(f"Could not lock {submit_lock.path}")
+            run_lock = _BuildLock(self._run_lock_path, wait=False)
+            if not run_lock.__enter__():
+                active = self._active_id()
+                # Not get(): checking for an abandoned job takes the submit lock
+                state = self._state(active) if active else None
+                if state is not None:
+                    return state, False
+                raise RuntimeError("A scrape is running but its job state is missing")
+            try:
+                job = ScrapeJob(id=uuid.uuid4().hex, trigger=trigger)
+                self._running = job
+                self._save(job)
+                self._write(os.path.join(self._dir, "active"), job.id)
+                self._prune()
+            except BaseException:
+                self._running = None
+                run_lock.__exit__(None, None, None)
+                raise
+        self._executor.submit(self._run, job, run_lock)
+        return job.to_dict(), True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._running
+        if job is not None and job.id == job_id:
+            return job.to_dict()  # live counters
+        state = self._load(job_id) if _JOB_ID.fullmatch(job_id) else None
+        if state is not None and state["status"] not in ("succeeded", "failed"):
+            state = self._check_abandoned(job_id) or state
+        return state
+
+    def list(self) -> List[dict]:
+        jobs = [self.get(name[:-5]) for name in self._job_files()]
+        jobs = [j for j in jobs if j is not None]
+        return sorted(jobs, key=lambda j: j["submitted_at"], reverse=True)[: self._history]
+
+    def _run(self, job: ScrapeJob, run_lock: _BuildLock):
+        finished = threading.Event()
+        saver = threading.Thread(target=self._save_every, args=(job, finished), name="scrape-state", daemon=True)
+        job.status = "running"
+        job.started_at = time.time()
+        logger.info(f"Scrape job {job.id} started ({job.trigger})")
+        saver.start()
+        try:
+            self._save(job)
+            from crawler.pipeline import run_scrape
+
+            run_scrape(stats=job.stats)
+            invalidate_search_store()  # serve the new rows without waiting for the poll
+            invalidate_title_index()
+            job.status = "succeeded"
+        except Exception as e:
+            logger.exception(f"Scrape job {job.id} failed")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            finished.set()
+            saver.join()
+            try:
+                self._save(job)  # final state before other workers may start a scrape
+            except OSError as e:
+                logger.warning(f"Could not save scrape job {job.id}: {e}")
+            self._running = None
+            run_lock.__exit__(None, None, None)
+
+    def _save_every(self, job: ScrapeJob, finished: threading.Event):
+        # Progress for the other workers; this one serves the live counters
+        while not finished.wait(JOB_STATE_INTERVAL):
+            try:
+                self._save(job)
+            except OSError as e:
+                logger.warning(f"Could not save scrape job {job.id}: {e}")
+
+    def _check_abandoned(self, job_id: str) -> Optional[dict]:
+        """Mark a queued/running job failed if no process holds the run lock any more."""
+        with self._submit_lock() as locked, _BuildLock(self._run_lock_path, wait=False) as free:
+            if not (locked and free):
+                return None
+            state = self._load(job_id)  # may have finished while we took the locks
+            if state is None or state["status"] in ("succeeded", "failed"):
+                return state
+            state.update(status="failed", error="The worker running this scrape exited",
+                         finished_at=time.time())
+            self._write(self._path(job_id), json.dumps(state))
+            return state
+
+    def _submit_lock(self) -> _BuildLock:
+        return _BuildLock(self._submit_lock_path)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self._dir, f"{job_id}.json")
+
+    def _job_files(self) -> List[str]:
+        try:
+            return [n for n in os.listdir(self._dir) if n.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _state(self, job_id: str) -> Optional[dict]:
+        job = self._running
+        if job is not None and job.id == job_id:
+            return job.to_dict()
+        return self._load(job_id) if _JOB_ID.fullmatch(job_id) else None
+
+    def _active_id(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self._dir, "active"), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        if state["started_at"] is not None and state["finished_at"] is None:
+            state["elapsed_seconds"] = round(time.time() - state["started_at"], 3)
+        return state
+
+    def _save(self, job: ScrapeJob):
+        self._write(self._path(job.id), json.dumps(job.to_dict()))
+
+    def _write(self, path: str, text: str):
+        os.makedirs(self._dir, exist_ok=True)
+        tmp = f"{path}.tmp.{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)  # readers in other workers never see a partial file
+
+    def _prune(self):
+        # Called under the submit lock: keep the newest `history` jobs
+        files = sorted(self._job_files(), key=lambda n: os.path.getmtime(os.path.join(self._dir, n)))
+        for name in files[: max(len(files) - self._history, 0)]:
+            try:
+                os.remove(os.path.join(self._dir, name))
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def start_scheduler(manager: ScrapeJobManager, data_dir: str = DATA_DIR):
+    """Start the cron for nightly scrapes in one API worker only.
+
+    Returns None when disabled or when another worker already runs it; the
+    worker holding DATA_DIR/scheduler.lock keeps it until it exits.
+    """
+    global _scheduler_lock
+    if not SCHEDULE_ENABLED:
+        return None
+    lock = _BuildLock(os.path.join(data_dir, "scheduler.lock"), wait=False)
+    if not lock.__enter__():
+        if lock.error is not None:
+            logger.warning(f"Scrape schedule disabled, cannot create {lock.path}: {lock.error}")
+        return None
+    _scheduler_lock = lock
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler = BackgroundScheduler(timezone=SCHEDULE_TIMEZONE)
+    scheduler.add_job(
+        lambda: manager.submit(trigger="schedule"),
+        CronTrigger(minute=SCHEDULE_CRON_MINUTE, hour=SCHEDULE_CRON_HOUR, timezone=SCHEDULE_TIMEZONE),
+        id="scrape",
+        coalesce=True,
+        max_instances=1,
+        replace_existing=True,
+    )
+    scheduler.start()
+    logger.info(f"Scrape scheduled at {SCHEDULE_CRON_HOUR}:{SCHEDULE_CRON_MINUTE} ({SCHEDULE_TIMEZONE})")
+    return scheduler
@@ -1,27 +1,82 @@
 from __future__ import annotations
 import os
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import List
 
 # Load environment variables from .env
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+from loguru import logger
 
-from crawler.pipeline import run_scrape
-from search.rank import search_ranked_documents
-from llm.memory import AnswerMemory
-from llm.answerer import build_answer, TOPK
+from db.crud import create_all
+from search.rank import results_version, search_ranked_documents, search_ranked_documents_batch
+from search.suggest import MAX_SUGGESTIONS, suggest_titles
+from llm.answerer import build_answer
+from metrics.timing import (
+    METRICS_ENABLED,
+    inc_counter,
+    start_request,
+    finish_request,
+    observe_request,
+    server_timing_header,
+    render_prometheus,
+)
 
 from .schemas import (
     SearchRequest,
     SearchResponse,
-    SearchDocument,
+    SearchBatchRequest,
+    SearchBatchResponse,
     AnswerRequest,
     AnswerResponse,
+    ScrapeJobResponse,
+    Suggestion,
+    SuggestResponse,
+)
+from .responses import RawJSONResponse, documents, etag, not_modified
+from .deps import get_memory, ready, start_warm_up, warmup_errors
+from .jobs import ScrapeJobManager, start_scheduler
+from .admission import (
+    AdmissionController,
+    Overloaded,
+    PRIORITIES,
+    ANSWER_MAX_CONCURRENCY,
+    ANSWER_MAX_QUEUE,
+    ANSWER_QUEUE_TIMEOUT,
 )
 
-app = FastAPI(title="UIDAI RAG API", version="0.1.0")
+# Responses at least this large are gzip-compressed for clients that accept it (0 = off)
+GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", "1000"))
+
+scrape_jobs = ScrapeJobManager()
+# Gemini-backed work is bounded; /search runs in FastAPI's own threadpool and
+# never waits behind it.
+answer_admission = AdmissionController("answer", ANSWER_MAX_CONCURRENCY, ANSWER_MAX_QUEUE, ANSWER_QUEUE_TIMEOUT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        create_all()  # also adds columns introduced since the DB was created
+    except Exception as e:
+        logger.warning(f"Could not create/upgrade the DB schema: {e}")
+    start_warm_up()  # /healthz answers 503 until the search store and answer memory are loaded
+    scheduler = start_scheduler(scrape_jobs)
+    yield
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    scrape_jobs.shutdown()
+    answer_admission.shutdown()
+
+
+app = FastAPI(title="UIDAI RAG API", version="0.1.0", lifespan=lifespan)
 
 # Allow frontend CORS
 app.add_middleware(
@@ -30,32 +85,99 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
+if GZIP_MIN_BYTES > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    token = start_request()
+    t0 = perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        timings = finish_request(token)
+    total = perf_counter() - t0
+    route = request.scope.get("route")
+    observe_request(getattr(route, "path", "unmatched"), total)
+    response.headers["Server-Timing"] = server_timing_header(timings, total)
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/healthz")
 async def healthz():
+    # Readiness: load balancers should only route here once warm
+    if not ready.is_set():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if warmup_errors:
+        return {"status": "ok", "warmup_errors": warmup_errors}
     return {"status": "ok"}
 
-@app.post("/scrape")
+@app.post("/scrape", response_model=ScrapeJobResponse, status_code=202)
 async def scrape():
-    total = run_scrape()
-    return {"status": "ok", "upserted": total}
+    # Returns immediately; poll /scrape/{job_id} for progress. If a scrape is
+    # already queued or running, that job is returned instead of a new one.
+    job, _ = scrape_jobs.submit(trigger="api")
+    return job
+
+@app.get("/scrape", response_model=List[ScrapeJobResponse])
+async def scrape_jobs_list():
+    return scrape_jobs.list()
+
+@app.get("/scrape/{job_id}", response_model=ScrapeJobResponse)
+async def scrape_status(job_id: str):
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown scrape job")
+    return job
 
 @app.post("/search", response_model=SearchResponse)
-async def search(req: SearchRequest = Body(...)):
+def search(request: Request, req: SearchRequest = Body(...)):
+    # Same query, top_k and corpus (and day, for recency) -> same results, so
+    # a client sending the ETag back gets a 304 and nothing is searched
+    tag = etag(req.query, req.top_k, results_version())
+    if not_modified(request, tag):
+        inc_counter("uidai_search_not_modified_total", help="/search requests answered 304 from If-None-Match")
+        return Response(status_code=304, headers={"ETag": tag})
     ranked = search_ranked_documents(req.query, top_k=req.top_k)
-    return SearchResponse(
-        query=req.query,
-        top_k=req.top_k,
-        results=[SearchDocument(**d) for d in ranked],
+    return RawJSONResponse(
+        {"query": req.query, "top_k": req.top_k, "results": documents(ranked)},
+        headers={"ETag": tag},
     )
 
-memory = AnswerMemory()
+@app.post("/search/batch", response_model=SearchBatchResponse)
+def search_batch(req: SearchBatchRequest = Body(...)):
+    # Same results as one /search per query; filters, BM25 statistics and the
+    # DB round trip are shared across the batch
+    ranked = search_ranked_documents_batch(req.queries, top_k=req.top_k)
+    return RawJSONResponse({
+        "top_k": req.top_k,
+        "results": [
+            {"query": q, "top_k": req.top_k, "results": documents(docs)} for q, docs in zip(req.queries, ranked)
+        ],
+    })
+
+@app.get("/suggest", response_model=SuggestResponse)
+def suggest(q: str = Query(..., max_length=200), limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS)):
+    # Typeahead: served from an in-memory prefix index, no DB round trip
+    return SuggestResponse(prefix=q, suggestions=[Suggestion(**s) for s in suggest_titles(q, limit)])
 
 @app.post("/answer", response_model=AnswerResponse)
-async def answer(req: AnswerRequest):
-    global TOPK
-    if req.top_k:
-        os.environ["ANSWER_TOPK"] = str(req.top_k)
-    result = build_answer(req.query, memory)
+async def answer(req: AnswerRequest, request: Request):
+    priority = PRIORITIES.get(request.headers.get("x-request-priority", "normal").lower(), PRIORITIES["normal"])
+    memory = await run_in_threadpool(get_memory)  # already open once warm
+    try:
+        result = await answer_admission.run(build_answer, req.query, memory, req.top_k, priority=priority)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Answer service overloaded ({e.reason}); retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     return AnswerResponse(**result)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+import hashlib
+import json
+from datetime import date
+from typing import Any, Dict, List
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .schemas import SearchDocument
+
+# /search answers are a pure function of (query, top_k, results version), so
+# that triple hashed is an ETag: a client sending it back in If-None-Match
+# gets a 304 without the search running at all. The tag is weak: GZipMiddleware
+# may send the same answer gzip-compressed or not, and a strong tag would have
+# to differ between the two byte-different bodies.
+_FIELDS = tuple(SearchDocument.model_fields)
+
+
+def etag(*parts: Any) -> str:
+    return 'W/"' + hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest() + '"'
+
+
+def not_modified(request: Request, tag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison, as If-None-Match requires
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or tag.removeprefix("W/") in tags
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def documents(ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Ranked rows shaped like SearchDocument (same fields and order)."""
+    return [{f: d.get(f) for f in _FIELDS} for d in ranked]
+
+
+class RawJSONResponse(JSONResponse):
+    """JSON of dicts we built ourselves: no pydantic validation and re-serialization on the way out."""
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date
 from pydantic import BaseModel, Field
 
@@ -26,15 +26,49 @@ class SearchResponse(BaseModel):
     top_k: int
     results: List[SearchDocument]
 
+class SearchBatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=500, description="Query texts, answered in order")
+    top_k: int = Field(10, ge=1, le=50)
+
+class SearchBatchResponse(BaseModel):
+    top_k: int
+    results: List[SearchResponse]  # one per query, same order
+
 # --- Phase 3 additions ---
 from pydantic import BaseModel, Field
 from typing import List
 
 class AnswerRequest(BaseModel):
     query: str = Field(..., description="User query text")
-    top_k: int | None = None  # optional override
+    top_k: int | None = Field(None, ge=1, le=50)  # optional override
 
 class AnswerResponse(BaseModel):
     content: str  # pre-formatted 3-section text
     source_site: str
-    documents: List[SearchDocument]  # reuse document shape with scores
\ No newline at end of file
+    documents: List[SearchDocument]  # reuse document shape with scores
+
+class ScrapeJobResponse(BaseModel):
+    job_id: str
+    trigger: str
+    status: str  # queued | running | succeeded | failed
+    pages_total: int
+    pages_fetched: int
+    pages_failed: int
+    items_parsed: int
+    rows_upserted: int
+    stages: Dict[str, Dict[str, float]] = {}  # per pipeline stage: throughput, busy/blocked time, queue occupancy
+    elapsed_seconds: float
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+class Suggestion(BaseModel):
+    id: int
+    title: str
+    category: Optional[str] = None
+    published_date: Optional[date] = None
+
+class SuggestResponse(BaseModel):
+    prefix: str
+    suggestions: List[Suggestion]
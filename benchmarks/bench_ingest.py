@@ -0,0 +1,64 @@
+from __future__ import annotations
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import crawler.pipeline as pipeline
+from db.crud import upsert_documents
+from .common import populate, record, reset_db
+from .synthetic import documents, listing_html
+
+CHUNK = 5000
+ITEMS_PER_PAGE = 500
+
+
+def _scrape(pages: Dict[str, str], fetch_latency_s: float, **workers) -> float:
+    """run_scrape over canned pages; fetches only sleep, nothing leaves the box."""
+    def fake_get(session, url):
+        time.sleep(fetch_latency_s)
+        return SimpleNamespace(url=url, text=pages[url])
+
+    real_get = pipeline.polite_get
+    pipeline.polite_get = fake_get
+    try:
+        reset_db()
+        t0 = time.perf_counter()
+        pipeline.run_scrape(urls=list(pages), **workers)
+        return time.perf_counter() - t0
+    finally:
+        pipeline.polite_get = real_get
+
+
+def run(sizes: List[int], **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for n in sizes:
+        # Fresh inserts, in page-sized chunks like a scrape would send them
+        spent = populate(n, chunk=CHUNK)
+        out.append(record("upsert_documents", n, "insert_rows_per_s", n / spent, "rows/s", higher_is_better=True))
+
+        # Re-scrape of unchanged pages: every row hits the "existing" branch
+        t0 = time.perf_counter()
+        batch: List[Dict[str, Any]] = []
+        for doc in documents(n):
+            batch.append(doc)
+            if len(batch) >= CHUNK:
+                upsert_documents(batch)
+                batch = []
+        if batch:
+            upsert_documents(batch)
+        elapsed = time.perf_counter() - t0
+        out.append(record("upsert_documents", n, "noop_rows_per_s", n / elapsed, "rows/s", higher_is_better=True))
+
+        # Whole scrape pipeline with a simulated network: one worker per stage
+        # vs overlapped fetch/parse/upsert
+        n_pages = max(1, n // ITEMS_PER_PAGE)
+        pages = {f"https://bench.invalid/page/{i}.html": listing_html(ITEMS_PER_PAGE, seed=i) for i in range(n_pages)}
+        latency = opts.get("fetch_latency_ms", 700) / 1000  # polite delay + a slow government site
+        single = _scrape(pages, latency, fetch_workers=1, parse_workers=0)
+        staged = _scrape(pages, latency)
+        out += [
+            record("scrape_pipeline", n, "single_worker_pages_per_s", n_pages / single, "pages/s", higher_is_better=True),
+            record("scrape_pipeline", n, "staged_pages_per_s", n_pages / staged, "pages/s", higher_is_better=True),
+        ]
+        reset_db()
+    return out
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import llm.memory as memory_mod
+from llm.memory import AnswerMemory, META_PATH, VEC_PATH, vec_header
+from .common import latency_records, record
+from .synthetic import answer_vectors
+
+DIM = 768
+
+
+def _prefill(n: int):
+    """Write an n-answer store straight to disk (not part of the timing)."""
+    with open(VEC_PATH, "wb") as f:
+        f.write(vec_header(DIM))
+        f.write(answer_vectors(n, DIM, seed=2).tobytes())
+    with open(META_PATH, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"idx": i, "question": f"q{i}", "answer": f"a{i}", "doc_ids": [i], "created_at": "2024-01-01T00:00:00Z"}) + "\n")
+
+
+def run(sizes: List[int], ops: int = 50, **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    probe = answer_vectors(ops, DIM, seed=3)
+    # Embeddings come from the synthetic vectors; only FAISS + file I/O is measured
+    cursor = {"i": 0}
+
+    def fake_embed(text: str):
+        v = probe[cursor["i"] % ops]
+        cursor["i"] += 1
+        return v.tolist()
+
+    memory_mod.embed_text = fake_embed
+    for n in sizes:
+        for p in (VEC_PATH, META_PATH):
+            if os.path.exists(p):
+                os.remove(p)
+        _prefill(n)
+
+        t0 = time.perf_counter()
+        mem = AnswerMemory()
+        out.append(record("answer_memory", n, "load_ms", 1000 * (time.perf_counter() - t0), "ms"))
+
+        adds = []
+        for i in range(ops):
+            t0 = time.perf_counter()
+            mem.add_answer(f"bench q{i}", f"bench a{i}", [i])
+            adds.append(time.perf_counter() - t0)
+        out += latency_records("answer_memory", n, adds, prefix="add")
+
+        searches = []
+        for i in range(ops):
+            t0 = time.perf_counter()
+            mem.search_similar(f"bench q{i}", k=5)
+            searches.append(time.perf_counter() - t0)
+        out += latency_records("answer_memory", n, searches, prefix="search")
+    return out
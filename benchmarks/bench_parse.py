@@ -0,0 +1,28 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, List
+
+from crawler.parsers import parse_listing
+from .common import record
+from .synthetic import listing_html
+
+ITEMS_PER_PAGE = 500
+
+
+def run(sizes: List[int], **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    page = listing_html(ITEMS_PER_PAGE)
+    page_bytes = len(page.encode("utf-8"))
+    for n in sizes:
+        pages = max(1, n // ITEMS_PER_PAGE)
+        parsed = 0
+        t0 = time.perf_counter()
+        for _ in range(pages):
+            parsed += len(parse_listing(page))
+        elapsed = time.perf_counter() - t0
+        out += [
+            record("parse_listing", n, "items_per_s", parsed / elapsed, "items/s", higher_is_better=True),
+            record("parse_listing", n, "mb_per_s", pages * page_bytes / elapsed / 1e6, "MB/s", higher_is_better=True),
+            record("parse_listing", n, "page_ms", 1000 * elapsed / pages, "ms"),
+        ]
+    return out
@@ -0,0 +1,203 @@
+from __future__ import annotations
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+import search.rank as rank
+import search.suggest as suggest
+from search.rank import search_ranked_documents, search_ranked_documents_batch
+from search.suggest import get_suggest_index, suggest_titles
+from search.dense import update_title_index, invalidate as invalidate_title_index
+from db.crud import fetch_documents
+from llm.answerer import TOPK as ANSWER_TOPK
+from metrics.timing import counter_value
+from .common import ensure_corpus, latency_records, record, timed_loop
+from .synthetic import SUBJECTS, queries
+
+
+def _typo_queries(n: int, seed: int = 7) -> List[Tuple[str, str]]:
+    """(query with one letter dropped from each word, the correctly spelled query)."""
+    rng = random.Random(seed)
+    titles = [d["title"] for d in fetch_documents(limit=5000)]
+    out = []
+    for title in rng.sample(titles, min(n, len(titles))):
+        words = [w for w in title.split() if len(w) >= 6 and w.isalpha()][:3]
+        if not words:
+            continue
+        typos = []
+        for w in words:
+            i = rng.randrange(1, len(w) - 1)
+            typos.append(w[:i] + w[i + 1:])
+        out.append((" ".join(typos).lower(), " ".join(words).lower()))
+    return out
+
+
+_SUFFIXES = ("ation", "ment", "ing", "ed", "es", "s")
+
+
+def _inflect(word: str) -> str:
+    """Same stem, another ending: "authentication" -> "authenticating", "updated" -> "updating"."""
+    suf = next((s for s in _SUFFIXES if word.endswith(s) and len(word) - len(s) >= 4), None)
+    if suf is None:
+        return word
+    return word[:-len(suf)] + ("ed" if suf == "ing" else "ing")
+
+
+def _subject_queries(n: int, seed: int = 11) -> List[Tuple[str, str, str]]:
+    """(query from a subject's words, the same words inflected differently, the subject)."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < n:
+        subject = rng.choice(SUBJECTS)
+        words = [w.lower() for w in subject.split() if len(w) >= 5 and w.isalpha()]
+        words = rng.sample(words, min(3, len(words)))
+        variants = [_inflect(w) for w in words]
+        if variants != words:
+            out.append((" ".join(words), " ".join(variants), subject))
+    return out
+
+
+def _precision_at(pairs: List[Tuple[str, str]], k: int) -> float:
+    """Share of the top k whose title is about the subject the query was made from."""
+    total = 0.0
+    for query, subject in pairs:
+        docs = search_ranked_documents(query, top_k=k)
+        total += sum(subject in d["title"] for d in docs) / k
+    return total / max(1, len(pairs))
+
+
+def _overlap_at(qs: List[str], k: int) -> float:
+    """Share of the BM25-only top k that hybrid search also returns."""
+    total = 0.0
+    for q in qs:
+        rank.HYBRID_ENABLED = False
+        want = {d["id"] for d in search_ranked_documents(q, top_k=k)}
+        rank.HYBRID_ENABLED = True
+        got = {d["id"] for d in search_ranked_documents(q, top_k=k)}
+        total += len(want & got) / max(1, len(want))
+    return total / max(1, len(qs))
+
+
+def _recall_at(pairs: List[Tuple[str, str]], k: int) -> float:
+    """Share of the correctly spelled query's top k that the misspelled query also returns."""
+    total = 0.0
+    for typo, correct in pairs:
+        want = {d["id"] for d in search_ranked_documents(correct, top_k=k)}
+        got = {d["id"] for d in search_ranked_documents(typo, top_k=k)}
+        total += len(want & got) / max(1, len(want))
+    return total / max(1, len(pairs))
+
+
+def _topk_run(qs: List[str], mode: str, budget_s: float) -> Tuple[List[float], float, List[List[Any]]]:
+    """(latency samples, rows scored per query, results) with rank.TOPK_MODE = mode."""
+    rank.TOPK_MODE = mode
+    search_ranked_documents(qs[0], top_k=ANSWER_TOPK)
+    before = counter_value("uidai_search_rows_scored_total")
+    results = [[(d["id"], d["score"]) for d in search_ranked_documents(q, top_k=ANSWER_TOPK)] for q in qs]
+    scored = (counter_value("uidai_search_rows_scored_total") - before) / len(qs)
+    samples = timed_loop(lambda i: search_ranked_documents(qs[i % len(qs)], top_k=ANSWER_TOPK), len(qs), budget_s)
+    return samples, scored, results
+
+
+def _prefixes(n: int, seed: int = 3) -> List[str]:
+    """Typeahead inputs: 1-6 leading letters of a title word, sometimes after a full word."""
+    rng = random.Random(seed)
+    titles = [d["title"] for d in fetch_documents(limit=5000)]
+    out = []
+    for title in rng.sample(titles, min(n, len(titles))):
+        words = [w.lower() for w in title.split() if w.isalpha()]
+        if not words:
+            continue
+        i = rng.randrange(len(words))
+        prefix = words[i][:rng.randint(1, 6)]
+        out.append(f"{words[i - 1]} {prefix}" if i and rng.random() < 0.3 else prefix)
+    return out
+
+
+def run(sizes: List[int], n_queries: int = 50, budget_s: float = 20.0, top_k: int = 10, **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    qs = queries(n_queries, seed=1)
+    hybrid = rank.HYBRID_ENABLED
+    for n in sizes:
+        ensure_corpus(n)
+        t0 = time.perf_counter()
+        update_title_index(rebuild=True)  # ids restart with every synthetic corpus
+        invalidate_title_index()
+        out.append(record("hybrid", n, "title_index_build_ms", (time.perf_counter() - t0) * 1000, "ms"))
+        try:
+            for enabled in (False, True):
+                rank.HYBRID_ENABLED = enabled
+                suite = "hybrid" if enabled else "search_ranked_documents"
+                search_ranked_documents(qs[0], top_k=top_k)  # warm caches / connection pool
+                samples = timed_loop(lambda i: search_ranked_documents(qs[i % len(qs)], top_k=top_k), n_queries, budget_s)
+                out += latency_records(suite, n, samples)
+                out.append(record(suite, n, "qps", len(samples) / sum(samples), "q/s", higher_is_better=True))
+                # Subject words as in the titles, and inflected differently ("enrolling" for "enrolment")
+                subjects = _subject_queries(100)
+                out.append(record(suite, n, "subject_precision_at_10", _precision_at([(q, s) for q, _, s in subjects], top_k), "ratio", higher_is_better=True))
+                out.append(record(suite, n, "variant_precision_at_10", _precision_at([(v, s) for _, v, s in subjects], top_k), "ratio", higher_is_better=True))
+            out.append(record("hybrid", n, "bm25_overlap_at_10", _overlap_at(qs, top_k), "ratio", higher_is_better=True))
+        finally:
+            rank.HYBRID_ENABLED = hybrid
+
+        # Early-terminating top k (as /answer asks for) vs scoring every row
+        mode = rank.TOPK_MODE
+        try:
+            for enabled in (False, True):
+                rank.HYBRID_ENABLED = enabled
+                runs = {m: _topk_run(qs, m, budget_s) for m in ("exhaustive", "maxscore")}
+                for m, (samples, scored, _) in runs.items():
+                    suite = f"topk_{m}" + ("_hybrid" if enabled else "")
+                    out += latency_records(suite, n, samples)
+                    out.append(record(suite, n, "rows_scored_per_query", scored, "rows"))
+                same = sum(a == b for a, b in zip(runs["exhaustive"][2], runs["maxscore"][2])) / len(qs)
+                out.append(record("topk_maxscore" + ("_hybrid" if enabled else ""), n, "same_as_exhaustive", same, "ratio", higher_is_better=True))
+        finally:
+            rank.TOPK_MODE = mode
+            rank.HYBRID_ENABLED = hybrid
+
+        # The same queries one call each vs one batch call
+        batch = queries(200, seed=5)
+        t0 = time.perf_counter()
+        for q in batch:
+            search_ranked_documents(q, top_k=top_k)
+        single_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        search_ranked_documents_batch(batch, top_k=top_k)
+        batch_s = time.perf_counter() - t0
+        out += [
+            record("search_batch", n, "single_calls_qps", len(batch) / single_s, "q/s", higher_is_better=True),
+            record("search_batch", n, "batch_qps", len(batch) / batch_s, "q/s", higher_is_better=True),
+            record("search_batch", n, "speedup", single_s / batch_s, "x", higher_is_better=True),
+        ]
+
+        tracemalloc.start()
+        search_ranked_documents(qs[1], top_k=top_k)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        out.append(record("search_ranked_documents", n, "peak_alloc_kb", peak / 1024, "KiB"))
+
+        # Typeahead over the in-memory prefix index
+        prefixes = _prefixes(200)
+        suggest._index = None  # a stale index would be rebuilt in the background; time an inline build
+        t0 = time.perf_counter()
+        get_suggest_index()
+        out.append(record("suggest", n, "index_build_ms", (time.perf_counter() - t0) * 1000, "ms"))
+        samples = timed_loop(lambda i: suggest_titles(prefixes[i % len(prefixes)]), len(prefixes) * 5, budget_s)
+        out += latency_records("suggest", n, samples)
+
+        # Misspelled queries: how much of the intended top 10 do they still find?
+        # (lexical only: this tracks the typo expansion itself)
+        pairs = _typo_queries(100)
+        fuzzy = rank.FUZZY_ENABLED
+        rank.HYBRID_ENABLED = False
+        try:
+            for enabled in (False, True):
+                rank.FUZZY_ENABLED = enabled
+                name = "typo_recall_at_10" if enabled else "typo_recall_at_10_exact_only"
+                out.append(record("search_ranked_documents", n, name, _recall_at(pairs, top_k), "ratio", higher_is_better=True))
+        finally:
+            rank.FUZZY_ENABLED = fuzzy
+            rank.HYBRID_ENABLED = hybrid
+    return out
@@ -0,0 +1,95 @@
+"""Read latency while a bulk upsert is running, per SQLite connection profile.
+
+Each profile runs in its own interpreter because db.session configures the
+engines at import time.
+"""
+from __future__ import annotations
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from .common import latency_records, record
+
+PROFILES = ("default", "performance")
+WRITE_ROWS = 20_000
+WRITE_CHUNK = 1_000
+
+
+def _bulk_write(size: int, elapsed):
+    from db.crud import upsert_documents
+    from .synthetic import documents
+
+    t0 = time.perf_counter()
+    batch = []
+    for doc in documents(WRITE_ROWS, seed=size + 7):
+        doc["doc_url"] += "?bulk"  # new rows, not updates
+        batch.append(doc)
+        if len(batch) >= WRITE_CHUNK:
+            upsert_documents(batch)
+            batch = []
+    if batch:
+        upsert_documents(batch)
+    elapsed.value = time.perf_counter() - t0
+
+
+def _child(size: int, profile: str) -> List[Dict[str, Any]]:
+    from sqlalchemy.exc import OperationalError
+    from db.crud import fetch_documents
+    from .common import populate
+
+    suite = f"sqlite_{profile}"
+    populate(size)
+    def read():
+        return fetch_documents(categories=["Circulars", "Notifications"])  # a typical filtered search load
+
+    idle = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        read()
+        idle.append(time.perf_counter() - t0)
+
+    # The writer is a separate process, like a scrape job next to API workers
+    ctx = mp.get_context("spawn")
+    write_s = ctx.Value("d", 0.0)
+    proc = ctx.Process(target=_bulk_write, args=(size, write_s))
+    proc.start()
+    busy, errors = [], 0
+    while proc.is_alive():
+        t0 = time.perf_counter()
+        try:
+            read()
+        except OperationalError:  # "database is locked"
+            errors += 1
+        busy.append(time.perf_counter() - t0)
+    proc.join()
+
+    out = latency_records(suite, size, idle, prefix="read_idle")
+    out += latency_records(suite, size, busy, prefix="read_during_write")
+    out.append(record(suite, size, "read_errors", errors, "count"))
+    out.append(record(suite, size, "reads_during_write", len(busy), "count", higher_is_better=True))
+    out.append(record(suite, size, "write_rows_per_s", WRITE_ROWS / write_s.value, "rows/s", higher_is_better=True))
+    return out
+
+
+def run(sizes: List[int], **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for n in sizes:
+        for profile in PROFILES:
+            workdir = tempfile.mkdtemp(prefix=f"uidai-sqlite-{profile}-")
+            env = dict(os.environ, SQLITE_PROFILE=profile, DATA_DIR=workdir,
+                       DB_URL=f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}")
+            res = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_sqlite", str(n), profile],
+                env=env, check=True, capture_output=True, text=True,
+            )
+            out += json.loads(res.stdout.strip().splitlines()[-1])
+    return out
+
+
+if __name__ == "__main__":
+    print(json.dumps(_child(int(sys.argv[1]), sys.argv[2])))
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from .common import ensure_corpus, record
+from .loadtest import _free_port
+
+_IMPORT = "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"
+
+
+def _import_seconds(runs: int = 3) -> float:
+    """Median wall time of `import api.main` in a fresh interpreter."""
+    samples = [
+        float(subprocess.check_output([sys.executable, "-c", _IMPORT], env=dict(os.environ), text=True).split()[-1])
+        for _ in range(runs)
+    ]
+    return statistics.median(samples)
+
+
+def _startup(timeout_s: float = 120.0) -> Dict[str, float]:
+    """Spawn uvicorn; seconds until it answers at all, until /healthz is 200, and the first /search."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+    out: Dict[str, float] = {}
+    try:
+        deadline = t0 + timeout_s
+        while time.perf_counter() < deadline:
+            try:
+                status = httpx.get(f"{base}/healthz", timeout=1).status_code
+            except httpx.HTTPError:
+                status = None
+            if status is not None:
+                out.setdefault("listening", time.perf_counter() - t0)
+            if status == 200:
+                out["ready"] = time.perf_counter() - t0
+                break
+            time.sleep(0.02)
+        else:
+            raise RuntimeError(f"API not ready within {timeout_s:.0f}s")
+        t = time.perf_counter()
+        httpx.post(f"{base}/search", json={"query": "aadhaar enrolment regulations", "top_k": 10}, timeout=30).raise_for_status()
+        out["first_search"] = time.perf_counter() - t
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return out
+
+
+def run(sizes: List[int], **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    os.environ.setdefault("LLM_BACKEND", "stub")
+    for n in sizes:
+        ensure_corpus(n)
+        out.append(record("startup", n, "import_ms", _import_seconds() * 1000, "ms"))
+        t = _startup()
+        out += [
+            record("startup", n, "time_to_listen_ms", t["listening"] * 1000, "ms"),
+            record("startup", n, "time_to_ready_ms", t["ready"] * 1000, "ms"),
+            record("startup", n, "first_search_ms", t["first_search"] * 1000, "ms"),
+        ]
+    return out
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from db.crud import corpus_version, fetch_documents, fetch_scoring_columns
+from search.index_file import index_path, open_index, write_index
+from search.store import build_store
+from .common import ensure_corpus, record
+
+# A worker's own (anonymous) memory for the search store: what each extra
+# uvicorn worker costs. Pages of the mapped index file are page cache, shared.
+# Per-query caches (filters, recency) are the same either way and left out.
+_WORKER = """
+import json
+def anon():
+    with open("/proc/self/smaps_rollup") as f:
+        return sum(int(line.split()[1]) for line in f if line.startswith("Anonymous:")) * 1024
+from search.store import get_store
+before = anon()
+get_store().title(0)
+print(json.dumps(anon() - before))
+"""
+
+
+def _retained(fn: Callable[[], Any]) -> Tuple[Any, int, float]:
+    """Call fn and return (result, bytes still allocated by it, seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def _worker_bytes(mmap: bool) -> int:
+    env = dict(os.environ, SEARCH_INDEX_MMAP=str(mmap).lower())
+    out = subprocess.check_output([sys.executable, "-c", _WORKER], env=env, text=True, timeout=600)
+    return json.loads(out.split()[-1])
+
+
+def run(sizes: List[int], **opts) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for n in sizes:
+        ensure_corpus(n)
+        # What search used to keep per request: one dict per candidate row
+        rows, dict_bytes, _ = _retained(lambda: fetch_documents())
+        del rows
+        store, store_bytes, build_s = _retained(lambda: build_store(fetch_scoring_columns(), corpus_version()))
+        out += [
+            record("document_store", n, "dicts_bytes_per_doc", dict_bytes / n, "B"),
+            record("document_store", n, "store_bytes_per_doc", store_bytes / n, "B"),
+            record("document_store", n, "store_array_bytes_per_doc", store.nbytes / n, "B"),
+            record("document_store", n, "reduction", dict_bytes / max(1, store_bytes), "x", higher_is_better=True),
+            record("document_store", n, "build_ms", build_s * 1000, "ms"),
+        ]
+        t0 = time.perf_counter()
+        path = write_index(store, index_path())
+        write_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        open_index(store.version, path)
+        out += [
+            record("document_store", n, "index_write_ms", write_s * 1000, "ms"),
+            record("document_store", n, "index_open_ms", (time.perf_counter() - t0) * 1000, "ms"),
+            record("document_store", n, "index_file_bytes_per_doc", os.path.getsize(path) / n, "B"),
+        ]
+        if os.path.exists("/proc/self/smaps_rollup"):  # Linux only
+            private, mapped = _worker_bytes(False), _worker_bytes(True)
+            out += [
+                record("document_store", n, "worker_private_bytes_per_doc", private / n, "B"),
+                record("document_store", n, "worker_private_bytes_per_doc_mmap", mapped / n, "B"),
+            ]
+    return out
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def parse_sizes(spec: str) -> List[int]:
+    return [SIZES[s.strip().lower()] if s.strip().lower() in SIZES else int(s) for s in spec.split(",") if s.strip()]
+
+
+def percentiles(samples: Iterable[float], qs=(50, 95, 99)) -> Dict[str, float]:
+    data = sorted(samples)
+    if not data:
+        return {f"p{q}": 0.0 for q in qs}
+    last = len(data) - 1
+    return {f"p{q}": data[min(last, int(q / 100 * len(data)))] for q in qs}
+
+
+def record(suite: str, size: int, metric: str, value: float, unit: str, higher_is_better: bool = False) -> Dict[str, Any]:
+    return {
+        "suite": suite,
+        "size": size,
+        "metric": metric,
+        "value": round(float(value), 6),
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+    }
+
+
+def latency_records(suite: str, size: int, samples_s: List[float], prefix: str = "latency") -> List[Dict[str, Any]]:
+    out = [record(suite, size, f"{prefix}_{k}_ms", v * 1000, "ms") for k, v in percentiles(samples_s).items()]
+    out.append(record(suite, size, f"{prefix}_mean_ms", 1000 * sum(samples_s) / max(1, len(samples_s)), "ms"))
+    return out
+
+
+def timed_loop(fn: Callable[[int], Any], max_iters: int, budget_s: float) -> List[float]:
+    """Call fn(i) up to max_iters times or until budget_s elapses (at least 3 runs)."""
+    samples: List[float] = []
+    deadline = time.perf_counter() + budget_s
+    for i in range(max_iters):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= 3 and time.perf_counter() > deadline:
+            break
+    return samples
+
+
+def reset_db():
+    from db.session import engine
+    from db.models import Base
+    from db.crud import create_all
+
+    Base.metadata.drop_all(bind=engine)
+    create_all()
+
+
+def populate(n: int, chunk: int = 5000, seed: int = 0) -> float:
+    """Load n synthetic documents into a fresh DB; returns seconds spent upserting."""
+    from db.crud import upsert_documents
+    from .synthetic import documents
+
+    from search.store import invalidate
+
+    reset_db()
+    invalidate()
+    spent = 0.0
+    batch: List[Dict[str, Any]] = []
+    for doc in documents(n, seed=seed):
+        batch.append(doc)
+        if len(batch) >= chunk:
+            t0 = time.perf_counter()
+            upsert_documents(batch)
+            spent += time.perf_counter() - t0
+            batch = []
+    if batch:
+        t0 = time.perf_counter()
+        upsert_documents(batch)
+        spent += time.perf_counter() - t0
+    return spent
+
+
+def ensure_corpus(n: int) -> None:
+    """Reuse the DB left behind by the ingest suite when it already holds n rows."""
+    from sqlalchemy import func, select
+    from db.session import SessionLocal
+    from db.models import Document
+
+    try:
+        with SessionLocal() as db:
+            have = db.execute(select(func.count(Document.id))).scalar_one()
+    except Exception:
+        have = -1
+    if have != n:
+        populate(n)
@@ -0,0 +1,53 @@
+"""Compare two benchmarks.run result files and flag regressions.
+
+    python -m benchmarks.compare base.json head.json --threshold 0.10
+
+Exits 1 when any metric got worse by more than the threshold.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    return doc["meta"], {(r["suite"], r["size"], r["metric"]): r for r in doc["results"]}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("base")
+    ap.add_argument("head")
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative change treated as a regression")
+    args = ap.parse_args(argv)
+
+    base_meta, base = _load(args.base)
+    head_meta, head = _load(args.head)
+    print(f"base {base_meta.get('git_rev')} ({base_meta.get('timestamp')}) -> head {head_meta.get('git_rev')} ({head_meta.get('timestamp')})")
+
+    regressions = 0
+    for key in sorted(set(base) & set(head), key=lambda k: (k[0], k[1], k[2])):
+        b, h = base[key], head[key]
+        if not b["value"]:
+            continue
+        change = (h["value"] - b["value"]) / abs(b["value"])
+        # Normalise so that positive == better regardless of metric direction
+        gain = change if h.get("higher_is_better") else -change
+        flag = ""
+        if gain < -args.threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        elif gain > args.threshold:
+            flag = "improved"
+        suite, size, metric = key
+        print(f"{suite:<26} n={size:<8} {metric:<22} {b['value']:>12.3f} -> {h['value']:>12.3f} {h['unit']:<6} {change:+7.1%} {flag}")
+    for key in sorted(set(head) - set(base)):
+        print(f"{key[0]:<26} n={key[1]:<8} {key[2]:<22} (new) {head[key]['value']:.3f} {head[key]['unit']}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
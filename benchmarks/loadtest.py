@@ -0,0 +1,278 @@
+"""Replay a query log against the API and report throughput and tail latency.
+
+Offline by default: the app runs in-process (httpx ASGI transport) with the
+stub LLM on a synthetic corpus. Examples:
+
+    # closed loop, 16 concurrent clients for 30 s, 80/20 search/answer mix
+    python -m benchmarks.loadtest --concurrency 16 --duration 30 --mix search=0.8,answer=0.2
+
+    # open loop at 50 req/s against a local uvicorn with 4 workers
+    python -m benchmarks.loadtest --spawn --workers 4 --rate 50 --duration 60
+
+    # replay a recorded log against an already running server
+    python -m benchmarks.loadtest --target http://localhost:8000 --log queries.jsonl
+
+Log lines are JSON objects with "query" and optionally "endpoint"
+("search" or "answer") and "top_k"; other lines are skipped.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .common import latency_records, percentiles, record
+
+
+def load_log(path: str) -> List[Dict[str, Any]]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict) and obj.get("query"):
+                out.append(obj)
+    return out
+
+
+def corpus_queries(n: int, seed: int = 0) -> List[str]:
+    """Queries made from real titles in the configured DB (2-4 words each)."""
+    from sqlalchemy import select
+    from db.session import SessionLocal
+    from db.models import Document
+
+    with SessionLocal() as db:
+        titles = [t for (t,) in db.execute(select(Document.title).limit(5000))]
+    if not titles:
+        return []
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = [w for w in rng.choice(titles).split() if len(w) > 3]
+        out.append(" ".join(rng.sample(words, k=min(len(words), rng.randint(2, 4)))))
+    return out
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"search", "answer"}
+    if unknown:
+        raise ValueError(f"unknown endpoint(s) in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def build_workload(entries: List[Dict[str, Any]], mix: Dict[str, float], seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    work = []
+    for e in entries:
+        endpoint = e.get("endpoint") or rng.choices(names, weights)[0]
+        body = {"query": e["query"]}
+        if e.get("top_k"):
+            body["top_k"] = int(e["top_k"])
+        work.append({"endpoint": endpoint, "body": body})
+    return work
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.codes: Dict[str, Counter] = {}
+        self.errors: Counter = Counter()
+
+    def add(self, endpoint: str, seconds: float, status: Optional[int]):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.codes.setdefault(endpoint, Counter())[status or "exc"] += 1
+        if status is None or status >= 400:
+            self.errors[endpoint] += 1
+
+
+async def _send(client: httpx.AsyncClient, item: Dict[str, Any], stats: Stats, started: float):
+    status = None
+    try:
+        resp = await client.post(f"/{item['endpoint']}", json=item["body"])
+        status = resp.status_code
+    except Exception:
+        pass
+    # Measured from the intended start, so queueing delay is not hidden
+    stats.add(item["endpoint"], time.perf_counter() - started, status)
+
+
+async def closed_loop(client, work, stats: Stats, concurrency: int, duration: float, max_requests: int):
+    deadline = time.perf_counter() + duration
+    counter = iter(range(max_requests))
+
+    async def worker():
+        for i in counter:
+            if time.perf_counter() > deadline:
+                return
+            await _send(client, work[i % len(work)], stats, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, work, stats: Stats, rate: float, duration: float, max_requests: int, seed: int = 0):
+    # Poisson arrivals; requests are fired on schedule whether or not earlier ones finished
+    rng = random.Random(seed)
+    tasks = []
+    t0 = time.perf_counter()
+    next_at = t0
+    for i in range(max_requests):
+        next_at += rng.expovariate(rate)
+        if next_at - t0 > duration:
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_send(client, work[i % len(work)], stats, next_at)))
+    await asyncio.gather(*tasks)
+
+
+def report(stats: Stats, elapsed: float, mode: str, level: float) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for endpoint, samples in sorted(stats.latencies.items()):
+        suite = f"loadtest_{endpoint}"
+        size = len(samples)
+        out.append(record(suite, size, "throughput_rps", size / elapsed, "req/s", higher_is_better=True))
+        out.append(record(suite, size, "error_rate", stats.errors[endpoint] / size, "ratio"))
+        out += latency_records(suite, size, samples)
+        p = percentiles(samples)
+        codes = ", ".join(f"{c}:{n}" for c, n in sorted(stats.codes[endpoint].items(), key=str))
+        print(
+            f"{endpoint:<7} n={size:<6} {size / elapsed:8.1f} req/s  errors={stats.errors[endpoint] / size:6.2%}  "
+            f"p50={p['p50'] * 1000:8.1f}ms p95={p['p95'] * 1000:8.1f}ms p99={p['p99'] * 1000:8.1f}ms  [{codes}]",
+            file=sys.stderr,
+        )
+    print(f"{mode}={level} elapsed={elapsed:.1f}s", file=sys.stderr)
+    return out
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_uvicorn(workers: int, env: Dict[str, str]) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base}/healthz", timeout=1).status_code == 200:
+                return proc, base
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 60s")
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    proc = None
+    lifespan = None
+    if args.target == "inproc" and not args.spawn:
+        from api.main import app
+
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout)
+    else:
+        base = args.target
+        if args.spawn:
+            proc, base = spawn_uvicorn(args.workers, dict(os.environ))
+        client = httpx.AsyncClient(
+            base_url=base,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=max(args.concurrency, 100)),
+        )
+
+    if args.log:
+        entries = load_log(args.log)
+    else:
+        entries = [{"query": q} for q in corpus_queries(args.synthesize)]
+    if not entries:
+        raise SystemExit("No queries: pass --log or point DB_URL at a populated corpus")
+    work = build_workload(entries, parse_mix(args.mix))
+
+    stats = Stats()
+    t0 = time.perf_counter()
+    try:
+        if args.rate:
+            await open_loop(client, work, stats, args.rate, args.duration, args.requests)
+            mode, level = "rate", args.rate
+        else:
+            await closed_loop(client, work, stats, args.concurrency, args.duration, args.requests)
+            mode, level = "concurrency", args.concurrency
+    finally:
+        elapsed = time.perf_counter() - t0
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return report(stats, elapsed, mode, level)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", default="inproc", help='"inproc" or a base URL such as http://localhost:8000')
+    ap.add_argument("--spawn", action="store_true", help="start a local uvicorn (stub LLM) instead of running in-process")
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    ap.add_argument("--log", default=None, help="JSONL query log to replay")
+    ap.add_argument("--synthesize", type=int, default=500, help="queries to derive from corpus titles when no --log")
+    ap.add_argument("--corpus", type=int, default=10_000, help="synthetic documents to load for inproc/--spawn runs")
+    ap.add_argument("--mix", default="search=0.8,answer=0.2", help="endpoint weights for log lines without one")
+    ap.add_argument("--concurrency", type=int, default=8, help="closed-loop clients")
+    ap.add_argument("--rate", type=float, default=None, help="open-loop arrival rate (req/s); overrides --concurrency")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    ap.add_argument("--requests", type=int, default=1_000_000, help="stop after this many requests")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--llm-latency-ms", type=float, default=800.0, help="simulated Gemini latency for the stub LLM")
+    ap.add_argument("--out", default=None, help="write benchmarks.compare-compatible JSON here")
+    args = ap.parse_args(argv)
+
+    if args.target == "inproc" or args.spawn:
+        # Fully offline: stub LLM, throw-away DB and answer store
+        workdir = tempfile.mkdtemp(prefix="uidai-load-")
+        os.environ["DB_URL"] = f"sqlite:///{os.path.join(workdir, 'load.sqlite')}"
+        os.environ["DATA_DIR"] = workdir
+        os.environ["LLM_BACKEND"] = "stub"
+        os.environ["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+        os.environ.setdefault("METRICS_ENABLED", "true")
+        from .common import populate
+
+        populate(args.corpus)
+
+    results = asyncio.run(run(args))
+    if args.out:
+        doc = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "args": vars(args)}, "results": results}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""Benchmark the search, ingest and answer-memory hot paths on synthetic data.
+
+    python -m benchmarks.run --sizes 1k,10k,100k --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Everything runs against a throw-away SQLite DB and DATA_DIR, never data/.
+"""
+from __future__ import annotations
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+SUITES = {
+    "parse": "benchmarks.bench_parse",
+    "ingest": "benchmarks.bench_ingest",
+    "search": "benchmarks.bench_search",
+    "memory": "benchmarks.bench_memory",
+    "sqlite": "benchmarks.bench_sqlite",
+    "store": "benchmarks.bench_store",
+    "startup": "benchmarks.bench_startup",
+}
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1k,10k,100k", help="comma list of corpus sizes: 1k,10k,100k,1m or integers")
+    ap.add_argument("--suites", default=",".join(SUITES), help=f"comma list from: {', '.join(SUITES)}")
+    ap.add_argument("--queries", type=int, default=50, help="queries per size for the search suite")
+    ap.add_argument("--budget", type=float, default=20.0, help="seconds per size for latency loops")
+    ap.add_argument("--workdir", default=None, help="directory for the benchmark DB and DATA_DIR (default: temp)")
+    ap.add_argument("--out", default=None, help="write JSON results here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="uidai-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # Must be set before db.session / llm.memory are imported by the suites
+    os.environ["DB_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}"
+    os.environ["DATA_DIR"] = workdir
+    os.environ["LLM_BACKEND"] = "stub"  # never call Gemini from a benchmark
+    os.environ.setdefault("METRICS_ENABLED", "false")
+
+    from .common import parse_sizes
+
+    sizes = parse_sizes(args.sizes)
+    results = []
+    for name in [s.strip() for s in args.suites.split(",") if s.strip()]:
+        if name not in SUITES:
+            ap.error(f"unknown suite {name!r}")
+        mod = importlib.import_module(SUITES[name])
+        t0 = time.perf_counter()
+        recs = mod.run(sizes, n_queries=args.queries, budget_s=args.budget)
+        print(f"[{name}] {len(recs)} results in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        for r in recs:
+            print(f"  {r['suite']:<26} n={r['size']:<8} {r['metric']:<22} {r['value']:>14.3f} {r['unit']}", file=sys.stderr)
+        results += recs
+
+    doc = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
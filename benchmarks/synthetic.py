@@ -0,0 +1,111 @@
+from __future__ import annotations
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from crawler.constants import SOURCE_CATEGORIES
+
+# Vocabulary lifted from real UIDAI listing titles so token frequencies
+# (very common "aadhaar", long tail of subjects) look like production.
+SUBJECTS = [
+    "Enrolment and Update", "Authentication and Offline Verification", "Data Security",
+    "Sharing of Information", "Transactions of Business at Meetings of the Authority",
+    "Appointment of Officers and Employees", "Pricing of Aadhaar Authentication Services",
+    "Targeted Delivery of Financial and Other Subsidies, Benefits and Services",
+    "Adjudication of Penalties", "Mechanism and Procedure for Submission of Complaints",
+    "Exchange of Information", "Aadhaar Seeding", "e-KYC Services", "Face Authentication",
+    "Iris Scanners and Fingerprint Devices", "Registrars and Enrolment Agencies",
+    "Document Update for Aadhaar Number Holders", "Aadhaar Letter and PVC Card",
+    "Virtual ID and Limited KYC", "Grievance Redressal",
+]
+KINDS = {
+    "Rules": ["Rules", "(Amendment) Rules"],
+    "Updated Rules": ["Rules (updated)", "Rules as amended"],
+    "Regulations": ["Regulations", "(Amendment) Regulations"],
+    "Updated Regulations": ["Regulations (updated)", "Regulations as amended"],
+    "Notifications": ["Notification", "Gazette Notification"],
+    "Circulars": ["Circular", "Office Memorandum"],
+    "Legal Framework": ["Act", "Ordinance"],
+    "About UIDAI": ["Annual Report", "Organisation Chart"],
+}
+QUERY_MODIFIERS = ["latest", "updated", "", "", "", "after 2019", "in 2021", "before 2018"]
+CATEGORIES = list(SOURCE_CATEGORIES.values())
+START = date(2010, 1, 1)
+SPAN_DAYS = (date(2025, 12, 31) - START).days
+
+
+def make_title(rng: random.Random, category: str, year: int) -> str:
+    subject = rng.choice(SUBJECTS)
+    kind = rng.choice(KINDS.get(category, ["Document"]))
+    if category == "Circulars":
+        return f"{kind} No. {rng.randint(1, 60)}/{year} regarding {subject}"
+    if category == "Notifications":
+        return f"{kind} dated {rng.randint(1, 28)}-{rng.randint(1, 12):02d}-{year} on {subject}"
+    return f"The Aadhaar ({subject}) {kind}, {year}"
+
+
+def documents(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield `n` upsert-ready dicts shaped like crawler.pipeline output."""
+    rng = random.Random(seed)
+    for i in range(n):
+        category = rng.choice(CATEGORIES)
+        published: Optional[date] = None
+        if rng.random() > 0.05:  # a few rows have no parsable date
+            published = START + timedelta(days=rng.randrange(SPAN_DAYS))
+        year = (published or START).year
+        slug = f"{category.lower().replace(' ', '-')}/{i}"
+        yield {
+            "serial_no": str(i % 500 + 1),
+            "title": make_title(rng, category, year),
+            "category": category,
+            "page_url": f"https://uidai.gov.in/en/about-uidai/legal-framework/{category.lower().replace(' ', '-')}.html",
+            "doc_url": f"https://uidai.gov.in/images/{slug}.pdf",
+            "download_url": f"https://uidai.gov.in/images/{slug}.pdf",
+            "file_type": "pdf",
+            "file_size_bytes": rng.randint(20_000, 5_000_000),
+            "published_date": published.isoformat() if published else None,
+            "updated_date": None,
+        }
+
+
+def listing_html(n_items: int, seed: int = 0) -> str:
+    """A UIDAI-style table listing with serial, title link, size, date and download."""
+    rng = random.Random(seed)
+    rows = []
+    for i, doc in enumerate(documents(n_items, seed=seed), start=1):
+        d = doc["published_date"]
+        date_str = date.fromisoformat(d).strftime("%d-%m-%Y") if d else ""
+        size_kb = doc["file_size_bytes"] / 1024
+        rows.append(
+            f"<tr><td>{i}.</td>"
+            f'<td><a href="/images/{rng.randrange(10**9)}.pdf">{doc["title"]}</a></td>'
+            f"<td>{size_kb:.1f} KB</td><td>{date_str}</td>"
+            f'<td><a href="/images/download/{i}.pdf" download>Download</a></td></tr>'
+        )
+    return (
+        "<html><body><div class='content'><table><thead><tr><th>S.No</th><th>Title</th>"
+        "<th>Size</th><th>Date</th><th></th></tr></thead><tbody>"
+        + "".join(rows)
+        + "</tbody></table></div></body></html>"
+    )
+
+
+def queries(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = rng.choice(SUBJECTS).lower().replace(",", "").split()
+        picked = rng.sample(words, k=min(len(words), rng.randint(1, 3)))
+        kind = rng.choice(["rules", "regulations", "circulars", "notification", ""])
+        out.append(" ".join(w for w in [rng.choice(QUERY_MODIFIERS), "aadhaar", *picked, kind] if w))
+    return out
+
+
+def answer_vectors(n: int, dim: int = 768, seed: int = 0) -> np.ndarray:
+    """Random unit vectors with the dimensionality of text-embedding-004."""
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim), dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs
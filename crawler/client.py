@@ -1,6 +1,7 @@
 from __future__ import annotations
 import os
 import time
+import threading
 from typing import Optional
 
 import requests
@@ -39,8 +40,23 @@ def make_session() -> requests.Session:
     return session
 
 
+# Request starts are spaced REQUEST_DELAY apart across all fetch threads, so
+# more threads overlap slow responses without raising the rate on the site.
+_rate_lock = threading.Lock()
+_next_request = 0.0
+
+
+def _wait_turn():
+    global _next_request
+    with _rate_lock:
+        now = time.monotonic()
+        _next_request = max(now, _next_request) + REQUEST_DELAY
+        delay = _next_request - now
+    time.sleep(delay)
+
+
 def polite_get(session: requests.Session, url: str) -> Optional[requests.Response]:
-    time.sleep(REQUEST_DELAY)
+    _wait_turn()
     resp = session.get(url)
     if resp.status_code >= 400:
         return None
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import os
+import re
+import zlib
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+from rapidfuzz import fuzz
+
+from db.crud import fetch_cluster_inputs, update_cluster_ids
+
+# The same instrument is often listed under several pages ("Rules" and
+# "Updated Rules", "Legal Framework", ...) with slightly different titles.
+# Near-duplicates are found with MinHash + LSH banding over character
+# shingles of the normalized title, verified with rapidfuzz, and grouped with
+# union-find. Each document's cluster_id is the smallest id in its cluster.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "92"))  # rapidfuzz token_sort_ratio, 0-100
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually share a bucket
+SHINGLE = 4
+MAX_BUCKET = 100  # compare at most this many members of one (degenerate) bucket
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1)  # fixed: signatures must agree across runs
+_A = _rng.randint(1, 1 << 31, size=(NUM_PERM, 1)).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=(NUM_PERM, 1)).astype(np.uint64)
+
+_NOISE = {"the", "updated"}
+_NON_WORD = re.compile(r"[^\w]+")
+_DIGITS = re.compile(r"\d+")
+# Same name, different instrument: "... Rules, 2016" vs "... Regulations, 2016"
+_KINDS = {"act", "rules", "rule", "regulations", "regulation", "amendment", "circular", "notification", "order", "memorandum"}
+
+
+def normalize_title(title: str) -> str:
+    words = _NON_WORD.sub(" ", (title or "").lower()).split()
+    return " ".join(w for w in words if w not in _NOISE)
+
+
+def _shingle_hashes(text: str) -> List[int]:
+    grams = {text[i:i + SHINGLE] for i in range(max(1, len(text) - SHINGLE + 1))}
+    return [zlib.crc32(g.encode("utf-8")) for g in grams]
+
+
+def minhash_signatures(texts: Sequence[str], chunk: int = 2000) -> np.ndarray:
+    """(len(texts), NUM_PERM) MinHash signatures of the texts' character shingles."""
+    out = np.empty((len(texts), NUM_PERM), dtype=np.uint64)
+    for start in range(0, len(texts), chunk):
+        hashes = [_shingle_hashes(t) for t in texts[start:start + chunk]]
+        hv = np.fromiter((h for hs in hashes for h in hs), dtype=np.uint64)
+        offsets = np.cumsum([0] + [len(hs) for hs in hashes[:-1]])
+        with np.errstate(over="ignore"):  # uint64 wraparound is part of the hash
+            permuted = ((_A * hv + _B) % _MERSENNE) & np.uint64(0xFFFFFFFF)
+        out[start:start + len(hashes)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return out
+
+
+def _similar(a: str, b: str) -> bool:
+    return fuzz.token_sort_ratio(a, b) >= DEDUP_THRESHOLD
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Lower index as root, so roots are the smallest member
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster_titles(ids: Sequence[int], titles: Sequence[str]) -> Dict[int, int]:
+    """Map each id to its cluster id (the smallest id among its near-duplicates)."""
+    order = sorted(range(len(ids)), key=lambda i: ids[i])
+    ids = [ids[i] for i in order]
+
+    # Identical normalized titles are duplicates outright; only one
+    # representative per distinct text goes through MinHash/LSH
+    uf = _UnionFind(len(ids))
+    first: Dict[str, int] = {}
+    for i in range(len(ids)):
+        text = normalize_title(titles[order[i]])
+        if not text:
+            continue
+        j = first.setdefault(text, i)
+        if j != i:
+            uf.union(i, j)
+    texts = list(first)
+    reps = list(first.values())
+
+    # Titles differing in a year/number or in the kind of instrument are never
+    # duplicates, so both are part of the bucket key and such pairs are never compared
+    buckets: Dict[Tuple[int, bytes, tuple], List[int]] = {}
+    rows = NUM_PERM // BANDS
+    for t, sig in enumerate(minhash_signatures(texts)):
+        words = texts[t].split()
+        must_match = (tuple(_DIGITS.findall(texts[t])), frozenset(w for w in words if w in _KINDS))
+        for band in range(BANDS):
+            buckets.setdefault((band, sig[band * rows:(band + 1) * rows].tobytes(), must_match), []).append(t)
+
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # Check each member against one text per cluster already in the bucket
+        roots: Dict[int, int] = {}
+        for t in members[:MAX_BUCKET]:
+            for root, other in list(roots.items()):
+                if uf.find(reps[t]) != uf.find(root) and _similar(texts[t], texts[other]):
+                    uf.union(reps[t], root)
+            roots.setdefault(uf.find(reps[t]), t)
+    return {ids[i]: ids[uf.find(i)] for i in range(len(ids))}
+
+
+def recompute_clusters() -> int:
+    """Recluster the whole corpus and store changed cluster ids; returns rows changed."""
+    ids, titles, current = fetch_cluster_inputs()
+    clusters = cluster_titles(ids, titles)
+    changed = [
+        {"id": doc_id, "cluster_id": clusters[doc_id]}
+        for doc_id, old in zip(ids, current)
+        if clusters[doc_id] != old
+    ]
+    update_cluster_ids(changed)
+    n_clusters = len(set(clusters.values()))
+    logger.info(f"Dedup: {len(ids)} documents in {n_clusters} clusters ({len(changed)} updated)")
+    return len(changed)
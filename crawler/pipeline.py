@@ -1,6 +1,12 @@
 from __future__ import annotations
 import os
-from typing import List
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from urllib.parse import urljoin
 
 from loguru import logger
@@ -8,22 +14,216 @@ from loguru import logger
 from .client import make_session, polite_get
 from .constants import SEED_URLS, SOURCE_CATEGORIES
 from .parsers import parse_listing
-from db.crud import upsert_documents
+from .dedup import DEDUP_ENABLED, recompute_clusters
+from db.crud import create_all, upsert_documents
+from search.dense import HYBRID_ENABLED
+from search.index_file import write_search_index
+from search.store import INDEX_MMAP
 
+# fetch (threads, I/O bound) -> parse (process pool, CPU bound) -> normalize -> upsert (single writer)
+FETCH_WORKERS = int(os.getenv("SCRAPE_FETCH_WORKERS", "4"))
+# Parse processes; 0 parses on a thread, which wins on single-core hosts (no spawn/IPC cost)
+PARSE_WORKERS = int(os.getenv("SCRAPE_PARSE_WORKERS", str(min(4, (os.cpu_count() or 1) - 1))))
+QUEUE_SIZE = int(os.getenv("SCRAPE_QUEUE_SIZE", "4"))  # per-stage inbox; a full inbox blocks the producer
+UPSERT_BATCH_SIZE = int(os.getenv("SCRAPE_UPSERT_BATCH_SIZE", "1000"))
 
-def run_scrape() -> int:
-    session = make_session()
-    total_saved = 0
-    for url in SEED_URLS:
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    workers: int = 1
+    processed: int = 0
+    emitted: int = 0
+    busy_seconds: float = 0.0  # inside the stage function
+    blocked_seconds: float = 0.0  # waiting for room downstream (backpressure)
+    queue_capacity: int = 0
+    queue_samples: int = 0
+    queue_total: int = 0
+    queue_max: int = 0
+
+    def snapshot(self, elapsed: float) -> dict:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "per_second": round(self.processed / elapsed, 3) if elapsed else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "queue_capacity": self.queue_capacity,
+            "queue_avg": round(self.queue_total / self.queue_samples, 3) if self.queue_samples else 0.0,
+            "queue_max": self.queue_max,
+        }
+
+
+@dataclass
+class ScrapeStats:
+    """Live counters for a scrape run; safe to read from another thread."""
+    pages_total: int = 0
+    pages_fetched: int = 0
+    pages_failed: int = 0
+    items_parsed: int = 0
+    rows_upserted: int = 0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    started_at: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def incr(self, **deltas: int):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def stage(self, name: str, **deltas):
+        with self._lock:
+            st = self.stages[name]
+            for k, delta in deltas.items():
+                setattr(st, k, getattr(st, k) + delta)
+
+    def sample_queue(self, name: str, depth: int):
+        with self._lock:
+            st = self.stages[name]
+            st.queue_samples += 1
+            st.queue_total += depth
+            st.queue_max = max(st.queue_max, depth)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = perf_counter() - self.started_at if self.started_at is not None else 0.0
+            return {
+                "pages_total": self.pages_total,
+                "pages_fetched": self.pages_fetched,
+                "pages_failed": self.pages_failed,
+                "items_parsed": self.items_parsed,
+                "rows_upserted": self.rows_upserted,
+                "stages": {name: st.snapshot(elapsed) for name, st in self.stages.items()},
+            }
+
+
+class Stage:
+    """A pipeline step run by `workers` threads.
+
+    `fn(item)` returns an iterable of outputs for the next stage's inbox;
+    `flush()` (optional) runs once after the last input, e.g. to write a
+    partial batch.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Iterable[Any]], workers: int = 1,
+                 flush: Optional[Callable[[], Iterable[Any]]] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.flush = flush
+        self.inbox: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._alive = self.workers
+        self._lock = threading.Lock()
+
+
+def run_stages(stages: List[Stage], source: Iterable[Any], stats: ScrapeStats):
+    """Stream `source` through `stages`; re-raises the first stage error.
+
+    Bounded inboxes give backpressure: a slow stage fills its inbox and its
+    producers block instead of buffering whole runs in memory. After an error
+    the remaining items are drained unprocessed so no producer stays blocked.
+    """
+    errors: List[BaseException] = []
+    for st in stages:
+        stats.stages[st.name] = StageStats(workers=st.workers, queue_capacity=QUEUE_SIZE)
+
+    def emit(st: Stage, nxt: Optional[Stage], outputs: List[Any]):
+        stats.stage(st.name, emitted=len(outputs))
+        if nxt is None:
+            return
+        t0 = perf_counter()
+        for out in outputs:
+            nxt.inbox.put(out)
+        stats.stage(st.name, blocked_seconds=perf_counter() - t0)
+
+    def work(i: int):
+        st = stages[i]
+        nxt = stages[i + 1] if i + 1 < len(stages) else None
+        while True:
+            stats.sample_queue(st.name, st.inbox.qsize())
+            item = st.inbox.get()
+            if item is _DONE:
+                break
+            if errors:
+                continue
+            t0 = perf_counter()
+            try:
+                outputs = list(st.fn(item))
+            except Exception as e:
+                logger.exception(f"Stage {st.name} failed")
+                errors.append(e)
+                continue
+            finally:
+                stats.stage(st.name, processed=1, busy_seconds=perf_counter() - t0)
+            emit(st, nxt, outputs)
+        with st._lock:
+            st._alive -= 1
+            last = st._alive == 0
+        if not last:
+            return
+        if st.flush is not None and not errors:
+            try:
+                emit(st, nxt, list(st.flush()))
+            except Exception as e:
+                logger.exception(f"Stage {st.name} failed")
+                errors.append(e)
+        if nxt is not None:
+            for _ in range(nxt.workers):
+                nxt.inbox.put(_DONE)
+
+    threads = [
+        threading.Thread(target=work, args=(i,), name=f"scrape-{st.name}-{w}", daemon=True)
+        for i, st in enumerate(stages)
+        for w in range(st.workers)
+    ]
+    for t in threads:
+        t.start()
+    for item in source:
+        stages[0].inbox.put(item)
+    for _ in range(stages[0].workers):
+        stages[0].inbox.put(_DONE)
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+
+def run_scrape(
+    stats: Optional[ScrapeStats] = None,
+    urls: Optional[List[str]] = None,
+    fetch_workers: int = FETCH_WORKERS,
+    parse_workers: int = PARSE_WORKERS,
+    batch_size: int = UPSERT_BATCH_SIZE,
+) -> int:
+    create_all()
+    stats = stats or ScrapeStats()
+    urls = list(SEED_URLS if urls is None else urls)
+    stats.pages_total = len(urls)
+    stats.started_at = perf_counter()
+    local = threading.local()  # requests.Session is not thread-safe; one per fetch thread
+
+    def fetch(url: str):
+        if not hasattr(local, "session"):
+            local.session = make_session()
         logger.info(f"Fetching: {url}")
-        resp = polite_get(session, url)
+        resp = polite_get(local.session, url)
         if not resp:
             logger.warning(f"Failed to fetch: {url}")
-            continue
-        html = resp.text
-        parsed = parse_listing(html)
+            stats.incr(pages_failed=1)
+            return []
+        stats.incr(pages_fetched=1)
+        return [(url, resp.url, resp.text)]
+
+    def parse(page):
+        url, base, html = page
+        parsed = pool.submit(parse_listing, html).result() if pool else parse_listing(html)
+        return [(url, base, parsed)]
+
+    def normalize(page):
+        url, base, parsed = page
         # Normalize absolute URLs
-        base = resp.url
         for item in parsed:
             if item.get("doc_url"):
                 item["doc_url"] = urljoin(base, item["doc_url"])  # type: ignore
@@ -32,8 +232,55 @@ def run_scrape() -> int:
             item["page_url"] = url
             item["category"] = SOURCE_CATEGORIES.get(url, "Unknown")
         logger.info(f"Parsed {len(parsed)} items from {url}")
-        saved = upsert_documents(parsed)
+        stats.incr(items_parsed=len(parsed))
+        return [parsed]
+
+    pending: List[Dict[str, Any]] = []
+    total_saved = 0
+
+    def write(items: List[Dict[str, Any]]):
+        nonlocal total_saved
+        saved = upsert_documents(items)
         total_saved += saved
-        logger.info(f"Upserted {saved} items from {url}")
+        stats.incr(rows_upserted=saved)
+        logger.info(f"Upserted {saved} new of {len(items)} items")
+
+    def upsert(parsed):
+        # Pages are small; write in row batches rather than one transaction per page
+        pending.extend(parsed)
+        while len(pending) >= batch_size:
+            write(pending[:batch_size])
+            del pending[:batch_size]
+        return []
+
+    def flush():
+        if pending:
+            write(pending)
+            pending.clear()
+        return []
+
+    # spawn, not fork: this runs inside a multi-threaded API process
+    pool = ProcessPoolExecutor(parse_workers, mp_context=multiprocessing.get_context("spawn")) if parse_workers > 0 else None
+    try:
+        run_stages([
+            Stage("fetch", fetch, workers=fetch_workers),
+            Stage("parse", parse, workers=max(1, parse_workers)),
+            Stage("normalize", normalize),
+            Stage("upsert", upsert, flush=flush),  # the single DB writer
+        ], urls, stats)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    if DEDUP_ENABLED:
+        recompute_clusters()
+    if HYBRID_ENABLED:
+        from search.dense import update_title_index
+
+        update_title_index()  # embeds only the documents not indexed yet, in batches
+    if INDEX_MMAP:
+        try:
+            write_search_index()  # API workers map the new snapshot on their next store check
+        except OSError as e:
+            logger.warning(f"Could not write the search index ({e}); API workers build their own")
     logger.success(f"Scrape complete. Upserted total: {total_saved}")
-    return total_saved
\ No newline at end of file
+    return total_saved
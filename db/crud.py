@@ -3,16 +3,26 @@ import hashlib
 from typing import Iterable, List, Dict, Any
 from datetime import date
 
-from sqlalchemy import select
+from sqlalchemy import select, update, inspect, text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from .session import SessionLocal, engine
+from .session import SessionLocal, ReadSessionLocal, engine
 from .models import Base, Document
 
 
 def create_all():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns():
+    # create_all never alters existing tables; add columns introduced later
+    cols = {c["name"] for c in inspect(engine).get_columns(Document.__tablename__)}
+    with engine.begin() as conn:
+        if "cluster_id" not in cols:
+            conn.execute(text("ALTER TABLE documents ADD COLUMN cluster_id INTEGER"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documents_cluster_id ON documents (cluster_id)"))
 
 
 def _compute_hash(item: Dict[str, Any]) -> str:
@@ -28,30 +38,47 @@ def _compute_hash(item: Dict[str, Any]) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+# Stay well below SQLite's bound-parameter limit in IN (...) lookups
+_IN_CHUNK = 500
+
+
 def upsert_documents(items: Iterable[Dict[str, Any]]) -> int:
+    # Keyed like uq_title_docurl; a key repeated within one call keeps its
+    # last version instead of tripping the unique constraint at commit
+    batch: Dict[tuple, Dict[str, Any]] = {}
+    for raw in items:
+        title = (raw.get("title") or "").strip()
+        doc_url = (raw.get("doc_url") or "").strip() or None
+        batch[(title, doc_url)] = raw
+    if not batch:
+        return 0
+
     count = 0
     with SessionLocal() as db:
-        for raw in items:
+        # One lookup per chunk of titles instead of a SELECT per row
+        existing: Dict[tuple, Document] = {}
+        titles = list({title for title, _ in batch})
+        for i in range(0, len(titles), _IN_CHUNK):
+            stmt = select(Document).where(Document.title.in_(titles[i:i + _IN_CHUNK]))
+            for doc in db.execute(stmt).scalars():
+                existing[(doc.title, doc.doc_url)] = doc
+
+        for (title, doc_url), raw in batch.items():
             content_hash = _compute_hash(raw)
-            title = (raw.get("title") or "").strip()
-            doc_url = (raw.get("doc_url") or "").strip() or None
-
-            # Try to find existing
-            stmt = select(Document).where(Document.title == title, Document.doc_url == doc_url)
-            existing = db.execute(stmt).scalars().first()
-
-            if existing:
-                if existing.content_hash != content_hash:
-                    existing.category = raw.get("category")
-                    existing.serial_no = raw.get("serial_no")
-                    existing.page_url = raw.get("page_url")
-                    existing.download_url = raw.get("download_url")
-                    existing.file_type = raw.get("file_type")
-                    existing.file_size_bytes = raw.get("file_size_bytes")
-                    existing.published_date = _to_date(raw.get("published_date"))
-                    existing.updated_date = _to_date(raw.get("updated_date"))
-                    existing.content_hash = content_hash
-                    db.add(existing)
+            existing_doc = existing.get((title, doc_url))
+
+            if existing_doc:
+                if existing_doc.content_hash != content_hash:
+                    existing_doc.category = raw.get("category")
+                    existing_doc.serial_no = raw.get("serial_no")
+                    existing_doc.page_url = raw.get("page_url")
+                    existing_doc.download_url = raw.get("download_url")
+                    existing_doc.file_type = raw.get("file_type")
+                    existing_doc.file_size_bytes = raw.get("file_size_bytes")
+                    existing_doc.published_date = _to_date(raw.get("published_date"))
+                    existing_doc.updated_date = _to_date(raw.get("updated_date"))
+                    existing_doc.content_hash = content_hash
+                    db.add(existing_doc)
             else:
                 doc = Document(
                     category=raw.get("category"),
@@ -82,9 +109,45 @@ def _to_date(s):
         return None
     
     # --- Phase 2 additions ---
-from typing import Optional, Sequence
-from sqlalchemy import and_, or_
-from datetime import date
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence, Tuple
+from sqlalchemy import and_, or_, func
+from datetime import date, datetime
+
+
+# Columns handed to ranking/API consumers (timestamps and content_hash are internal)
+DOCUMENT_FIELDS = (
+    "id",
+    "category",
+    "serial_no",
+    "title",
+    "page_url",
+    "doc_url",
+    "download_url",
+    "file_type",
+    "file_size_bytes",
+    "published_date",  # date or None
+    "updated_date",
+)
+_DOCUMENT_COLUMNS = [getattr(Document, f) for f in DOCUMENT_FIELDS]
+
+
+def _document_filters(
+    categories: Optional[Sequence[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    updated_since: Optional[datetime] = None,
+):
+    conds = []
+    if categories:
+        conds.append(Document.category.in_(list(categories)))
+    if date_from:
+        conds.append(Document.published_date >= date_from)
+    if date_to:
+        conds.append(Document.published_date <= date_to)
+    if updated_since:
+        conds.append(Document.updated_at >= updated_since)
+    return conds
 
 
 def fetch_documents(
@@ -96,34 +159,108 @@ def fetch_documents(
     """Load candidate documents for search with optional filters.
     Returns a list[dict] with primitive fields for ranking.
     """
-    results = []
-    with SessionLocal() as db:
-        stmt = select(Document)
-        conds = []
-        if categories:
-            conds.append(Document.category.in_(list(categories)))
-        if date_from:
-            conds.append(Document.published_date >= date_from)
-        if date_to:
-            conds.append(Document.published_date <= date_to)
+    with ReadSessionLocal() as db:
+        stmt = select(*_DOCUMENT_COLUMNS)
+        conds = _document_filters(categories, date_from, date_to)
         if conds:
             stmt = stmt.where(and_(*conds))
         if limit:
             stmt = stmt.limit(limit)
-        for row in db.execute(stmt).scalars():
-            results.append(
-                {
-                    "id": row.id,
-                    "category": row.category,
-                    "serial_no": row.serial_no,
-                    "title": row.title,
-                    "page_url": row.page_url,
-                    "doc_url": row.doc_url,
-                    "download_url": row.download_url,
-                    "file_type": row.file_type,
-                    "file_size_bytes": row.file_size_bytes,
-                    "published_date": row.published_date,  # date or None
-                    "updated_date": row.updated_date,
-                }
-            )
-    return results
\ No newline at end of file
+        return [dict(zip(DOCUMENT_FIELDS, row)) for row in db.execute(stmt)]
+
+
+def iter_documents(
+    categories: Optional[Sequence[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    updated_since: Optional[datetime] = None,
+    fields: Sequence[str] = DOCUMENT_FIELDS,
+    chunk_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """Stream matching rows in id order, `chunk_size` rows in memory at a time.
+
+    Same filters as fetch_documents plus `updated_since` (updated_at >= it),
+    for exports of tables too large to load at once.
+    """
+    stmt = select(*[getattr(Document, f) for f in fields])
+    conds = _document_filters(categories, date_from, date_to, updated_since)
+    if conds:
+        stmt = stmt.where(and_(*conds))
+    stmt = stmt.order_by(Document.id).execution_options(yield_per=chunk_size)
+    with ReadSessionLocal() as db:
+        for chunk in db.execute(stmt).partitions():
+            for row in chunk:
+                yield dict(zip(fields, row))
+
+
+@dataclass
+class ScoringColumns:
+    """Just what ranking reads, one tuple per column (row i across all)."""
+    ids: Tuple[int, ...] = ()
+    titles: Tuple[str, ...] = ()
+    categories: Tuple[Optional[str], ...] = ()
+    published_dates: Tuple[Optional[date], ...] = ()
+    cluster_ids: Tuple[Optional[int], ...] = ()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def fetch_scoring_columns(
+    categories: Optional[Sequence[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> ScoringColumns:
+    """Phase 1 of a search: the scoring columns for every candidate, by id."""
+    with ReadSessionLocal() as db:
+        stmt = select(Document.id, Document.title, Document.category, Document.published_date, Document.cluster_id)
+        conds = _document_filters(categories, date_from, date_to)
+        if conds:
+            stmt = stmt.where(and_(*conds))
+        stmt = stmt.order_by(Document.id)
+        if limit:
+            stmt = stmt.limit(limit)
+        rows = db.execute(stmt).all()
+    if not rows:
+        return ScoringColumns()
+    return ScoringColumns(*zip(*rows))
+
+
+def fetch_cluster_inputs() -> Tuple[Tuple[int, ...], Tuple[str, ...], Tuple[Optional[int], ...]]:
+    """(ids, titles, current cluster ids) of every document, for reclustering."""
+    with ReadSessionLocal() as db:
+        rows = db.execute(select(Document.id, Document.title, Document.cluster_id).order_by(Document.id)).all()
+    if not rows:
+        return (), (), ()
+    return tuple(zip(*rows))
+
+
+def update_cluster_ids(changes: Sequence[Dict[str, int]]):
+    """Bulk UPDATE of [{"id": ..., "cluster_id": ...}, ...] by primary key."""
+    if not changes:
+        return
+    with SessionLocal() as db:
+        db.execute(update(Document), list(changes))
+        db.commit()
+
+
+def corpus_version() -> Tuple:
+    """Changes whenever rows are inserted, updated or deleted; cheap enough to poll."""
+    with ReadSessionLocal() as db:
+        return tuple(db.execute(
+            select(func.count(Document.id), func.max(Document.id), func.max(Document.updated_at))
+        ).one())
+
+
+def fetch_documents_by_ids(ids: Sequence[int]) -> List[Dict[str, Any]]:
+    """Phase 2: full rows for the top-k winners, returned in the order of `ids`."""
+    if not ids:
+        return []
+    ids = list(ids)
+    by_id: Dict[int, Dict[str, Any]] = {}
+    with ReadSessionLocal() as db:
+        for i in range(0, len(ids), _IN_CHUNK):  # batch searches can ask for thousands
+            rows = db.execute(select(*_DOCUMENT_COLUMNS).where(Document.id.in_(ids[i:i + _IN_CHUNK])))
+            by_id.update((row[0], dict(zip(DOCUMENT_FIELDS, row))) for row in rows)
+    return [by_id[i] for i in ids if i in by_id]
@@ -29,6 +29,8 @@ class Document(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     content_hash: Mapped[str | None] = mapped_column(String(64))
+    # Smallest id among this document's near-duplicates (crawler/dedup.py)
+    cluster_id: Mapped[int | None] = mapped_column(Integer, index=True)
 
     __table_args__ = (
         UniqueConstraint("title", "doc_url", name="uq_title_docurl"),
@@ -1,11 +1,58 @@
 from __future__ import annotations
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 DB_URL = os.getenv("DB_URL", "sqlite:///data/uidai.sqlite")
 
+# "performance": WAL + relaxed fsync + big page cache/mmap on every connection,
+# so a scrape's write transaction no longer blocks searches. "default" keeps
+# SQLite's stock rollback journal (useful for comparisons).
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+
+_is_sqlite = DB_URL.startswith("sqlite")
+_is_memory = _is_sqlite and (DB_URL in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in DB_URL)
+
 # For SQLite, check_same_thread=False for multi-threaded FastAPI
-connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
+connect_args = {"check_same_thread": False} if _is_sqlite else {}
 engine = create_engine(DB_URL, echo=False, future=True, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+
+
+def _sqlite_pragmas(dbapi_conn, read_only: bool):
+    cur = dbapi_conn.cursor()
+    if not read_only:
+        # Persistent per database file; readers just inherit it
+        cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    if read_only:
+        cur.execute("PRAGMA query_only=ON")
+    cur.close()
+
+
+if _is_sqlite and not _is_memory and SQLITE_PROFILE == "performance":
+    event.listen(engine, "connect", lambda conn, rec: _sqlite_pragmas(conn, read_only=False))
+
+    # Search traffic gets its own pool of query_only connections; with WAL they
+    # read a consistent snapshot while the writer engine commits.
+    read_engine = create_engine(
+        DB_URL,
+        echo=False,
+        future=True,
+        connect_args=connect_args,
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE,
+    )
+    event.listen(read_engine, "connect", lambda conn, rec: _sqlite_pragmas(conn, read_only=True))
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, future=True)
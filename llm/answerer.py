@@ -1,19 +1,23 @@
 from __future__ import annotations
+import io
 import os
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 import requests
-from pypdf import PdfReader
 
 from search.rank import search_ranked_documents
 from .prompts import build_messages
 from .gemini_client import chat
-from .memory import AnswerMemory
+from metrics.timing import timed
+
+if TYPE_CHECKING:  # faiss is loaded with the memory itself, see api/deps.py
+    from .memory import AnswerMemory
 
 IST = ZoneInfo("Asia/Kolkata")
 TOPK = int(os.getenv("ANSWER_TOPK", "6"))
+MAX_TOPK = 50  # same bound as AnswerRequest.top_k
 MAX_SNIP = int(os.getenv("ANSWER_MAX_SNIPPET_CHARS", "1200"))
 
 _session = requests.Session()
@@ -24,7 +28,9 @@ def _safe_fetch_snippet(url: str) -> str:
         r = _session.get(url, timeout=20)
         r.raise_for_status()
         if r.headers.get("content-type", "").lower().startswith("application/pdf") or url.lower().endswith(".pdf"):
-            reader = PdfReader(io.BytesIO(r.content))  # type: ignore
+            from pypdf import PdfReader
+
+            reader = PdfReader(io.BytesIO(r.content))
             text = "\n".join(page.extract_text() or "" for page in reader.pages[:1])
         else:
             # fallback: naive text from bytes
@@ -34,9 +40,10 @@ def _safe_fetch_snippet(url: str) -> str:
         return ""
 
 
-def build_answer(query: str, memory: AnswerMemory) -> Dict:
-    # 1) Get top documents
-    docs = search_ranked_documents(query, top_k=TOPK)
+def build_answer(query: str, memory: AnswerMemory, top_k: int | None = None) -> Dict:
+    # 1) Get top documents (clamped: top_k may come straight from the client)
+    top_k = min(max(top_k or TOPK, 1), MAX_TOPK)
+    docs = search_ranked_documents(query, top_k=top_k)
 
     # 2) Optional snippets (best effort, PDF-first-page or HTML text)
     snippets: List[str] = []
@@ -49,8 +56,10 @@ def build_answer(query: str, memory: AnswerMemory) -> Dict:
             snippets.append("")
 
     # 3) Build LLM prompt and get the 3-block formatted content
-    messages = build_messages(query, docs, snippets)
-    content = chat(messages, temperature=0.2)
+    with timed("prompt_build"):
+        messages = build_messages(query, docs, snippets)
+    with timed("llm_chat"):
+        content = chat(messages, temperature=0.2)
 
     # 4) Persist answer (embeddings of answers only)
     memory.add_answer(query, content, [d["id"] for d in docs])
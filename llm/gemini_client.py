@@ -1,20 +1,41 @@
 from __future__ import annotations
 import os
+import threading
 from typing import List, Dict, Any
-import google.generativeai as genai
 
 CHAT_MODEL = os.getenv("GEMINI_CHAT_MODEL", "gemini-1.5-flash")
 EMB_MODEL = os.getenv("GEMINI_EMBED_MODEL", "models/text-embedding-004")
+# "gemini" (default) or "stub" for offline load tests, see llm/stub_client.py
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
 
-_api_key = os.getenv("GOOGLE_API_KEY")
-if not _api_key:
-    raise RuntimeError("GOOGLE_API_KEY not set in env")
+if LLM_BACKEND == "stub":
+    from . import stub_client as _stub
 
-genai.configure(api_key=_api_key)
+# google.generativeai takes most of the API's import time, so it is imported
+# and configured on first use (or by the startup warm-up), not at import.
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GOOGLE_API_KEY not set in env")
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
 
 # --- Chat helper ----------------------------------------------------------
 
 def chat(messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int | None = None) -> str:
+    if LLM_BACKEND == "stub":
+        return _stub.chat(messages, temperature, max_tokens)
     prompt_parts = []
     for m in messages:
         role = m["role"]
@@ -28,6 +49,7 @@ def chat(messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: i
     
     full_prompt = "\n\n".join(prompt_parts)
 
+    genai = get_genai()
     try:
         model = genai.GenerativeModel(CHAT_MODEL)
         response = model.generate_content(
@@ -45,16 +67,20 @@ def chat(messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: i
 # --- Embeddings helper ----------------------------------------------------
 
 def embed_texts(texts: List[str]) -> List[List[float]]:
+    # A list `content` is sent through batchEmbedContents (chunked by the SDK),
+    # i.e. one round trip per ~100 texts instead of one per text.
+    if not texts:
+        return []
+    if LLM_BACKEND == "stub":
+        return _stub.embed_texts(texts)
+    genai = get_genai()
     try:
-        embeddings = []
-        for text in texts:
-            result = genai.embed_content(
-                model=EMB_MODEL,
-                content=text,
-                task_type="retrieval_document"
-            )
-            embeddings.append(result['embedding'])
-        return embeddings
+        result = genai.embed_content(
+            model=EMB_MODEL,
+            content=list(texts),
+            task_type="retrieval_document"
+        )
+        return result['embedding']
     except Exception as e:
         print(f"Gemini embedding error: {e}")
         raise
@@ -1,18 +1,37 @@
 from __future__ import annotations
 import os
 import json
+import struct
+import threading
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 import numpy as np
 import faiss
 
 from .gemini_client import embed_text, embed_texts
+from metrics.timing import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 DATA_DIR = os.getenv("DATA_DIR", "data")
-INDEX_PATH = os.path.join(DATA_DIR, "answers.faiss")
+# Shared on-disk store, safe for several API processes (uvicorn --workers N):
+#   answers.vec          append-only float32 rows (row i == answer idx i)
+#   answers_meta.jsonl   append-only metadata, one line per row
+#   answers.lock         serializes writers; readers never take it
+# answers.faiss is only read once, to migrate stores written by older versions.
+VEC_PATH = os.path.join(DATA_DIR, "answers.vec")
 META_PATH = os.path.join(DATA_DIR, "answers_meta.jsonl")
+LOCK_PATH = os.path.join(DATA_DIR, "answers.lock")
+INDEX_PATH = os.path.join(DATA_DIR, "answers.faiss")
+
+_VEC_MAGIC = b"UIDAIVEC"
+VEC_HEADER_SIZE = 16  # magic + uint32 dim + reserved
 
 
 def _l2_normalize(vecs: np.ndarray) -> np.ndarray:
@@ -20,6 +39,54 @@ def _l2_normalize(vecs: np.ndarray) -> np.ndarray:
     return vecs / norms
 
 
+def vec_header(dim: int) -> bytes:
+    return _VEC_MAGIC + struct.pack("<II", dim, 0)
+
+
+def _read_dim(f) -> Optional[int]:
+    head = f.read(VEC_HEADER_SIZE)
+    if len(head) < VEC_HEADER_SIZE or not head.startswith(_VEC_MAGIC):
+        return None
+    return struct.unpack("<I", head[8:12])[0]
+
+
+class FileLock:
+    """Exclusive inter-process lock on LOCK_PATH (flock / msvcrt.locking)."""
+
+    def __init__(self, path: str = LOCK_PATH):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        else:
+            self._f.seek(0)
+            msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._f.close()
+            self._f = None
+        return False
+
+
+def _file_id(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
 @dataclass
 class AnswerMeta:
     idx: int
@@ -30,62 +97,171 @@ class AnswerMeta:
 
 
 class AnswerMemory:
+    """FAISS answer memory backed by the shared append-only store.
+
+    One writer at a time (FileLock), any number of readers: every process
+    keeps its own in-memory index and tails the files from the byte offsets
+    it has already consumed, so a refresh costs only the new rows. A rebuild
+    (scripts/backfill_answers.py) replaces the files, which readers notice by
+    inode and answer with a full reload.
+    """
+
     def __init__(self):
         os.makedirs(DATA_DIR, exist_ok=True)
         self.index: Optional[faiss.IndexFlatIP] = None
         self.dim: Optional[int] = None
         self.next_idx: int = 0
         self.meta: Dict[int, AnswerMeta] = {}
-        self._load()
-
-    def _load(self):
-        # Load meta
-        if os.path.exists(META_PATH):
-            with open(META_PATH, "r", encoding="utf-8") as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    obj = json.loads(line)
-                    m = AnswerMeta(**obj)
-                    self.meta[m.idx] = m
-                    self.next_idx = max(self.next_idx, m.idx + 1)
-        # Load FAISS index if present
-        if os.path.exists(INDEX_PATH):
-            self.index = faiss.read_index(INDEX_PATH)  # cosine via IP with normalized vectors
-            self.dim = self.index.d
-
-    def _ensure_index(self, dim: int):
+        self._lock = threading.RLock()
+        self._reset()
+        if not os.path.exists(VEC_PATH) and os.path.exists(INDEX_PATH):
+            self._migrate_legacy_index()
+        self.refresh()
+
+    def _reset(self):
+        self.index = None
+        self.dim = None
+        self.next_idx = 0
+        self.meta = {}
+        self._vec_rows = 0
+        self._meta_offset = 0
+        self._file_ids = (None, None)
+
+    def _migrate_legacy_index(self):
+        with FileLock():
+            if os.path.exists(VEC_PATH):
+                return
+            legacy = faiss.read_index(INDEX_PATH)
+            tmp = f"{VEC_PATH}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(vec_header(legacy.d))
+                if legacy.ntotal:
+                    f.write(legacy.reconstruct_n(0, legacy.ntotal).astype("float32").tobytes())
+            os.replace(tmp, VEC_PATH)
+
+    def refresh(self, file_locked: bool = False):
+        """Pick up rows appended (or a store rebuilt) by any process.
+
+        Pass file_locked=True when the caller already holds FileLock.
+        """
+        with self._lock:
+            if self._tail():
+                return
+        # A rebuild swaps both files one after the other while holding FileLock;
+        # reload them under it so vectors and metadata are always the same pair.
+        # FileLock before self._lock, the order add_answer takes them in.
+        if file_locked:
+            with self._lock:
+                self._reload()
+        else:
+            with FileLock(), self._lock:
+                self._reload()
+
+    def _tail(self) -> bool:
+        """Read what was appended since the last call; False if either file was replaced."""
+        ids = (_file_id(VEC_PATH), _file_id(META_PATH))
+        if any(old is not None and new != old for old, new in zip(self._file_ids, ids)):
+            return False
+        self._file_ids = ids
+        self._tail_vectors()
+        self._tail_meta()
+        return (_file_id(VEC_PATH), _file_id(META_PATH)) == ids  # not swapped while reading
+
+    def _reload(self):
+        self._reset()
+        self._tail()
+
+    def _tail_vectors(self):
+        if self._file_ids[0] is None:
+            return
+        with open(VEC_PATH, "rb") as f:
+            if self.dim is None:
+                self.dim = _read_dim(f)
+                if self.dim is None:
+                    return  # header not written yet
+            row_bytes = self.dim * 4
+            size = os.fstat(f.fileno()).st_size
+            rows = (size - VEC_HEADER_SIZE) // row_bytes  # ignore a half-written tail
+            if rows <= self._vec_rows:
+                return
+            f.seek(VEC_HEADER_SIZE + self._vec_rows * row_bytes)
+            buf = f.read((rows - self._vec_rows) * row_bytes)
         if self.index is None:
-            self.index = faiss.IndexFlatIP(dim)  # inner product
-            self.dim = dim
+            self.index = faiss.IndexFlatIP(self.dim)  # cosine via IP with normalized vectors
+        self.index.add(np.frombuffer(buf, dtype="float32").reshape(-1, self.dim))
+        self._vec_rows = rows
+
+    def _tail_meta(self):
+        if self._file_ids[1] is None:
+            return
+        with open(META_PATH, "rb") as f:
+            f.seek(self._meta_offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # only complete lines
+        pos = 0
+        for line in chunk[:end].splitlines(keepends=True):
+            if line.strip():
+                m = AnswerMeta(**json.loads(line))
+                if m.idx >= self._vec_rows:
+                    break  # vector not read yet (or never written); retry from here
+                self.meta[m.idx] = m
+                self.next_idx = max(self.next_idx, m.idx + 1)
+            pos += len(line)
+        self._meta_offset += pos
+
+    def _truncate_tails(self):
+        """Drop what a crashed writer left past the consumed offsets (call under FileLock).
+
+        That is a half-written vector row, a half-written meta line, or meta
+        lines whose vector was never written; appending after them would
+        misalign every later row with its idx.
+        """
+        for path, keep in ((VEC_PATH, VEC_HEADER_SIZE + self._vec_rows * self.dim * 4),
+                           (META_PATH, self._meta_offset)):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r+b") as f:
+                if os.fstat(f.fileno()).st_size > keep:
+                    f.truncate(keep)
 
     def add_answer(self, question: str, answer: str, doc_ids: List[int]):
         # Embed only the answer (persisted). Query embedding will be computed on the fly later.
-        emb = np.array([embed_text(answer)], dtype="float32")
-        emb = _l2_normalize(emb)
-        self._ensure_index(emb.shape[1])
-        idx = self.next_idx
-        self.index.add(emb)
-        meta = AnswerMeta(
-            idx=idx,
-            question=question,
-            answer=answer,
-            doc_ids=doc_ids,
-            created_at=datetime.utcnow().isoformat() + "Z",
-        )
-        self.meta[idx] = meta
-        self.next_idx += 1
-        # Persist
-        faiss.write_index(self.index, INDEX_PATH)
-        with open(META_PATH, "a", encoding="utf-8") as f:
-            f.write(json.dumps(asdict(meta), ensure_ascii=False) + "\n")
+        with timed("embed"):
+            emb = np.array([embed_text(answer)], dtype="float32")
+        emb = _l2_normalize(emb).astype("float32")
+        with timed("store_append"), FileLock():
+            self.refresh(file_locked=True)
+            if self.dim is None:
+                with open(VEC_PATH, "wb") as f:
+                    f.write(vec_header(emb.shape[1]))
+            elif self.dim != emb.shape[1]:
+                raise ValueError(f"Embedding dim {emb.shape[1]} != store dim {self.dim}; rebuild with scripts/backfill_answers.py")
+            else:
+                self._truncate_tails()
+            # The id is the row position, assigned while holding the lock
+            meta = AnswerMeta(
+                idx=self._vec_rows,
+                question=question,
+                answer=answer,
+                doc_ids=doc_ids,
+                created_at=datetime.utcnow().isoformat() + "Z",
+            )
+            with open(VEC_PATH, "ab") as f:
+                f.write(emb.tobytes())
+            with open(META_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(meta), ensure_ascii=False) + "\n")
+            self.refresh(file_locked=True)
+        return meta.idx
 
     def search_similar(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        self.refresh()
         if self.index is None or self.index.ntotal == 0:
             return []
-        q = np.array([embed_text(query)], dtype="float32")
+        with timed("embed"):
+            q = np.array([embed_text(query)], dtype="float32")
         q = _l2_normalize(q)
-        scores, ids = self.index.search(q, k)
+        with self._lock:
+            scores, ids = self.index.search(q, k)
         out: List[Dict[str, Any]] = []
         for score, idx in zip(scores[0], ids[0]):
             if idx == -1:
@@ -94,4 +270,4 @@ class AnswerMemory:
             if not m:
                 continue
             out.append({"score": float(score), **asdict(m)})
-        return out
\ No newline at end of file
+        return out
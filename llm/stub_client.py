@@ -0,0 +1,37 @@
+from __future__ import annotations
+import hashlib
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+# Offline stand-in for Gemini (LLM_BACKEND=stub), used by load tests and
+# benchmarks. STUB_LLM_LATENCY_MS simulates the upstream call time.
+STUB_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "0"))
+STUB_EMBED_DIM = int(os.getenv("STUB_EMBED_DIM", "768"))
+
+
+def chat(messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int | None = None) -> str:
+    if STUB_LATENCY_MS:
+        time.sleep(STUB_LATENCY_MS / 1000)
+    user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    query = next((line[len("User query: "):] for line in user.splitlines() if line.startswith("User query: ")), "")
+    return (
+        "## Response\n"
+        f"(stub) The listed UIDAI documents are the closest matches for: {query}\n\n"
+        "## Most Relevant Documents\n"
+        "See the documents list.\n\n"
+        "## Information Source Website\n"
+        "UIDAI (uidai.gov.in)"
+    )
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    # Deterministic per text, so identical answers map to identical vectors
+    out = []
+    for text in texts:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        v = np.random.default_rng(seed).standard_normal(STUB_EMBED_DIM).astype("float32")
+        out.append((v / np.linalg.norm(v)).tolist())
+    return out
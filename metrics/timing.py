@@ -0,0 +1,151 @@
+from __future__ import annotations
+import os
+import threading
+from collections import deque
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Quantiles are computed over a sliding window of the most recent samples
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+STAGE_METRIC = "uidai_stage_duration_seconds"
+REQUEST_METRIC = "uidai_request_duration_seconds"
+
+
+class Summary:
+    """Count/sum plus a bounded sample window for p50/p95/p99."""
+    __slots__ = ("count", "total", "_window", "_lock")
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self._window: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._window.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self._window)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        last = len(samples) - 1
+        return {q: samples[min(last, int(q * len(samples)))] for q in QUANTILES}
+
+
+_summaries: Dict[Tuple[str, str, str], Summary] = {}
+_gauges: Dict[str, Tuple[float, str]] = {}
+_counters: Dict[str, Tuple[float, str]] = {}
+_registry_lock = threading.Lock()
+# Per-request (stage, seconds) list, read back by the Server-Timing middleware
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _summary(metric: str, label: str, value: str) -> Summary:
+    key = (metric, label, value)
+    s = _summaries.get(key)
+    if s is None:
+        with _registry_lock:
+            s = _summaries.setdefault(key, Summary())
+    return s
+
+
+def observe(stage: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    _summary(STAGE_METRIC, "stage", stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+def observe_request(route: str, seconds: float):
+    if METRICS_ENABLED:
+        _summary(REQUEST_METRIC, "route", route).observe(seconds)
+
+
+def set_gauge(name: str, value: float, help: str = ""):
+    _gauges[name] = (float(value), help)
+
+
+def inc_counter(name: str, amount: float = 1.0, help: str = ""):
+    with _registry_lock:
+        value, _ = _counters.get(name, (0.0, help))
+        _counters[name] = (value + amount, help)
+
+
+def counter_value(name: str) -> float:
+    return _counters.get(name, (0.0, ""))[0]
+
+
+class timed:
+    """Context manager recording the wrapped block under `stage`.
+
+        with timed("store_build"):
+            store = build_store(cols)
+    """
+    __slots__ = ("stage", "_t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, perf_counter() - self._t0)
+        return False
+
+
+def start_request():
+    return _request_timings.set([])
+
+
+def finish_request(token) -> List[Tuple[str, float]]:
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    # Repeated stages within one request (e.g. two embeds) are summed
+    merged: Dict[str, float] = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    if total is not None:
+        merged["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in merged.items())
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    helps = {
+        STAGE_METRIC: "Duration of pipeline stages in seconds.",
+        REQUEST_METRIC: "Duration of HTTP requests in seconds.",
+    }
+    for metric, help in helps.items():
+        series = sorted((k, v) for k, v in _summaries.items() if k[0] == metric)
+        if not series:
+            continue
+        lines.append(f"# HELP {metric} {help}")
+        lines.append(f"# TYPE {metric} summary")
+        for (_, label, value), s in series:
+            for q, v in s.quantiles().items():
+                lines.append(f'{metric}{{{label}="{value}",quantile="{q}"}} {v:.6f}')
+            lines.append(f'{metric}_sum{{{label}="{value}"}} {s.total:.6f}')
+            lines.append(f'{metric}_count{{{label}="{value}"}} {s.count}')
+    for kind, values in (("gauge", _gauges), ("counter", _counters)):
+        for name, (value, help) in sorted(values.items()):
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
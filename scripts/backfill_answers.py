@@ -1,20 +1,151 @@
 from __future__ import annotations
-# If you later change models or want to rebuild the FAISS index from meta:
-# - Delete data/answers.faiss
-# - Run this script to re-add all answers from answers_meta.jsonl
+# If you later change models or want to rebuild the answer store from meta:
+#
+#   python -m scripts.backfill_answers --batch-size 100 --workers 4
+#
+# The meta file is streamed, answers are embedded in concurrent batches and the
+# new vector log is written next to the old one. Vectors and (compacted) meta
+# are then swapped in under the store lock, so a failed run leaves the previous
+# files untouched and running API workers reload on their next request.
 
+import os
 import json
-from llm.memory import AnswerMemory, META_PATH
+import hashlib
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
 
-if __name__ == "__main__":
-    mem = AnswerMemory()
-    if not os.path.exists(META_PATH):
-        print("No meta file; nothing to backfill.")
-        raise SystemExit(0)
-    with open(META_PATH, "r", encoding="utf-8") as f:
+import numpy as np
+
+from llm.gemini_client import embed_texts
+from llm.memory import META_PATH, VEC_PATH, INDEX_PATH, FileLock, _l2_normalize, vec_header
+
+
+def iter_meta(path: str, keep_duplicates: bool = False, start: int = 0, end: int | None = None) -> Iterator[Dict[str, Any]]:
+    # Earlier versions of this script re-appended every answer, so the same
+    # (question, answer) pair may be present several times. Only a 16-byte
+    # digest of each pair is kept, so memory stays small on large meta files.
+    seen = set()
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
         for line in f:
+            pos += len(line)
+            if end is not None and pos > end:
+                break
             if not line.strip():
                 continue
             obj = json.loads(line)
-            mem.add_answer(obj["question"], obj["answer"], obj.get("doc_ids", []))
-    print("Rebuilt FAISS index from meta.")
\ No newline at end of file
+            if not keep_duplicates:
+                key = hashlib.blake2b(
+                    json.dumps([obj["question"], obj["answer"]], ensure_ascii=False).encode("utf-8"), digest_size=16
+                ).digest()
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield obj
+
+
+def batched(it: Iterator[Dict[str, Any]], n: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for obj in it:
+        batch.append(obj)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _meta_end() -> int:
+    # Under the lock, so no API worker is part-way through appending a line
+    with FileLock():
+        return os.path.getsize(META_PATH)
+
+
+def _append_since(tmp_meta: str, tmp_vec: str, next_idx: int, start: int, end: int | None = None) -> int:
+    """Re-embed answers the API appended between `start` and `end` and add them to the new files."""
+    late = list(iter_meta(META_PATH, keep_duplicates=True, start=start, end=end))
+    if not late:
+        return 0
+    vecs = _l2_normalize(np.asarray(embed_texts([o["answer"] for o in late]), dtype="float32")).astype("float32")
+    with open(tmp_meta, "a", encoding="utf-8") as out, open(tmp_vec, "ab") as vec_out:
+        vec_out.write(vecs.tobytes())
+        for i, obj in enumerate(late):
+            obj["idx"] = next_idx + i
+            out.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    return len(late)
+
+
+def rebuild(batch_size: int = 100, workers: int = 4, keep_duplicates: bool = False) -> int:
+    dim = None
+    done = 0
+    started = time.perf_counter()
+    tmp_meta = f"{META_PATH}.rebuild"
+    tmp_vec = f"{VEC_PATH}.rebuild"
+    snapshot = _meta_end()
+
+    def drain(batch, fut, out, vec_out):
+        nonlocal dim, done
+        vecs = _l2_normalize(np.asarray(fut.result(), dtype="float32")).astype("float32")
+        if dim is None:
+            dim = vecs.shape[1]
+            vec_out.write(vec_header(dim))
+        vec_out.write(vecs.tobytes())
+        for obj in batch:
+            # Row position in the new vector log == idx, so renumber densely
+            obj["idx"] = done
+            out.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            done += 1
+        elapsed = time.perf_counter() - started
+        print(f"  embedded {done} answers in {elapsed:.1f}s ({done / elapsed:.1f}/s)")
+
+    try:
+        with open(tmp_meta, "w", encoding="utf-8") as out, open(tmp_vec, "wb") as vec_out, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+            for batch in batched(iter_meta(META_PATH, keep_duplicates, end=snapshot), batch_size):
+                pending.append((batch, pool.submit(embed_texts, [o["answer"] for o in batch])))
+                # Bound in-flight batches so memory stays flat on large meta files
+                while len(pending) >= workers * 2:
+                    drain(*pending.popleft(), out, vec_out)
+            while pending:
+                drain(*pending.popleft(), out, vec_out)
+
+        if dim is None:
+            return 0
+        # Answers appended by the API since we started streaming would be lost
+        # by the swap: embed them without blocking the API's writers, then,
+        # under the lock, only the few added meanwhile.
+        end = _meta_end()
+        done += _append_since(tmp_meta, tmp_vec, done, snapshot, end)
+        with FileLock():
+            done += _append_since(tmp_meta, tmp_vec, done, end)
+            os.replace(tmp_vec, VEC_PATH)
+            os.replace(tmp_meta, META_PATH)
+            if os.path.exists(INDEX_PATH):
+                os.remove(INDEX_PATH)  # pre-vector-log index, superseded
+    finally:
+        for tmp in (tmp_meta, tmp_vec):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return done
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rebuild the answer vector store from answers_meta.jsonl")
+    ap.add_argument("--batch-size", type=int, default=100, help="answers per embedding request")
+    ap.add_argument("--workers", type=int, default=4, help="concurrent embedding requests")
+    ap.add_argument("--keep-duplicates", action="store_true", help="do not drop repeated (question, answer) pairs")
+    args = ap.parse_args()
+
+    if not os.path.exists(META_PATH):
+        print("No meta file; nothing to backfill.")
+        raise SystemExit(0)
+    t0 = time.perf_counter()
+    total = rebuild(args.batch_size, args.workers, args.keep_duplicates)
+    elapsed = time.perf_counter() - t0
+    print(f"[OK] Rebuilt answer store from meta: {total} answers in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.1f}/s).")
@@ -0,0 +1,24 @@
+from __future__ import annotations
+# Write the memory-mapped search index that API workers share:
+#
+#   python -m scripts.build_search_index           # only if the DB changed since the last one
+#   python -m scripts.build_search_index --force   # rewrite it anyway
+#
+# Scrapes rewrite the index on their own and a worker that finds it missing or
+# stale rebuilds it, so this is for warming a deployment before it starts.
+
+import os
+import time
+import argparse
+
+from search.index_file import write_search_index
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serialize the search store into the shared index file")
+    ap.add_argument("--force", action="store_true", help="rewrite even when the index is current")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    path = write_search_index(force=args.force)
+    elapsed = time.perf_counter() - t0
+    print(f"[OK] Search index at {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {elapsed:.1f}s.")
@@ -0,0 +1,25 @@
+from __future__ import annotations
+# Build (or top up) the dense title index used by hybrid search:
+#
+#   python -m scripts.build_title_index              # embed documents not indexed yet
+#   python -m scripts.build_title_index --rebuild    # re-embed everything, e.g. after changing EMBED_HASH_DIM
+#
+# Scrapes keep the index up to date on their own; this is for existing
+# databases and backend changes. Running API workers pick up the new file.
+
+import time
+import argparse
+
+from search.dense import title_index_path, update_title_index
+from search.embed import EMBED_BACKEND, EMBED_BATCH_SIZE
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Embed document titles into the FAISS title index")
+    ap.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="titles per embedding call")
+    ap.add_argument("--rebuild", action="store_true", help="start from an empty index")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    added = update_title_index(args.batch_size, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - t0
+    print(f"[OK] Embedded {added} documents with {EMBED_BACKEND} into {title_index_path()} in {elapsed:.1f}s.")
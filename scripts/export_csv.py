@@ -0,0 +1,128 @@
+from __future__ import annotations
+# Export the documents table as CSV or JSONL:
+#
+#   python -m scripts.export_csv --out exports/documents.csv.gz
+#   python -m scripts.export_csv --format jsonl --category Circulars --date-from 2020-01-01 --out -
+#   python -m scripts.export_csv --since 2024-06-01T00:00:00 --out exports/changed.jsonl
+#
+# Rows are streamed from the DB in --chunk-size batches and written as they
+# arrive, so memory stays flat however large the table is. --since exports
+# only rows inserted/updated at or after that UTC timestamp; the summary line
+# prints the value to pass next time for an incremental export.
+
+import os
+import sys
+import csv
+import gzip
+import json
+import time
+import argparse
+from datetime import date, datetime, timezone
+from typing import IO, Any, Dict, Iterable, Optional
+
+from db.crud import DOCUMENT_FIELDS, iter_documents
+
+EXPORT_FIELDS = DOCUMENT_FIELDS + ("created_at", "updated_at")
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _utc_naive(s: str) -> datetime:
+    # updated_at is stored as naive UTC
+    dt = datetime.fromisoformat(s)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _open_out(path: str, use_gzip: bool) -> IO[str]:
+    if path == "-":
+        if use_gzip:
+            return gzip.open(sys.stdout.buffer, "wt", encoding="utf-8", newline="")
+        return sys.stdout
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if use_gzip:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def write_rows(rows: Iterable[Dict[str, Any]], out: IO[str], fmt: str) -> Dict[str, Any]:
+    """Write rows incrementally; returns {"rows": n, "max_updated_at": ...}."""
+    n = 0
+    max_updated: Optional[datetime] = None
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    for row in rows:
+        updated = row.get("updated_at")
+        if updated is not None and (max_updated is None or updated > max_updated):
+            max_updated = updated
+        row = {k: _plain(v) for k, v in row.items()}
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        n += 1
+    return {"rows": n, "max_updated_at": max_updated}
+
+
+def export(
+    out_path: str,
+    fmt: str = "csv",
+    use_gzip: bool = False,
+    categories=None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    since: Optional[datetime] = None,
+    chunk_size: int = 1000,
+) -> Dict[str, Any]:
+    rows = iter_documents(
+        categories=categories,
+        date_from=date_from,
+        date_to=date_to,
+        updated_since=since,
+        fields=EXPORT_FIELDS,
+        chunk_size=chunk_size,
+    )
+    out = _open_out(out_path, use_gzip)
+    try:
+        return write_rows(rows, out, fmt)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stream the documents table to CSV or JSONL")
+    ap.add_argument("--out", default="-", help="output file, or - for stdout (default)")
+    ap.add_argument("--format", choices=("csv", "jsonl"), help="default: from --out extension, else csv")
+    ap.add_argument("--gzip", action="store_true", help="gzip the output (implied by a .gz --out)")
+    ap.add_argument("--category", action="append", dest="categories", help="repeatable; exact category name")
+    ap.add_argument("--date-from", type=date.fromisoformat, help="published on or after YYYY-MM-DD")
+    ap.add_argument("--date-to", type=date.fromisoformat, help="published on or before YYYY-MM-DD")
+    ap.add_argument("--since", type=_utc_naive, help="only rows with updated_at >= this ISO timestamp (UTC)")
+    ap.add_argument("--chunk-size", type=int, default=1000, help="rows fetched from the DB per round trip")
+    args = ap.parse_args()
+
+    name = args.out[:-3] if args.out.endswith(".gz") else args.out
+    fmt = args.format or ("jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv")
+    use_gzip = args.gzip or args.out.endswith(".gz")
+
+    t0 = time.perf_counter()
+    try:
+        result = export(args.out, fmt, use_gzip, args.categories, args.date_from, args.date_to, args.since, args.chunk_size)
+    except BrokenPipeError:  # e.g. piped into head; silence the flush at exit too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        raise SystemExit(0)
+    elapsed = time.perf_counter() - t0
+    # Keep stdout clean when the export itself goes there
+    log = sys.stderr if args.out == "-" else sys.stdout
+    print(f"[OK] Exported {result['rows']} documents as {fmt}{' (gzip)' if use_gzip else ''} "
+          f"in {elapsed:.1f}s ({result['rows'] / elapsed if elapsed else 0:.0f} rows/s).", file=log)
+    if result["max_updated_at"] is not None:
+        print(f"     Next incremental export: --since {result['max_updated_at'].isoformat()}", file=log)
@@ -1,14 +1,30 @@
 from __future__ import annotations
-from typing import List
-from rank_bm25 import BM25Okapi
+import math
 
+import numpy as np
 
-class BM25:
-    def __init__(self, documents: List[List[str]]):
-        # documents is a list of token lists
-        self.model = BM25Okapi(documents)
-        self.max_idf = max(self.model.idf.values()) if self.model.idf else 1.0
+# Array version of BM25Okapi for the columnar store (search/store.py). The
+# arithmetic mirrors rank_bm25 term for term so both give identical scores.
+K1, B, EPSILON = 1.5, 0.75, 0.25
 
-    def get_scores(self, query_tokens: List[str]) -> List[float]:
-        # Raw BM25 scores (unbounded); we will normalize later
-        return list(self.model.get_scores(query_tokens))
\ No newline at end of file
+
+def okapi_idf(n: int, df: int) -> float:
+    return math.log(n - df + 0.5) - math.log(df + 0.5)
+
+
+def okapi_average_idf(n: int, dfs: np.ndarray) -> float:
+    """Mean raw idf over the terms present (df > 0), as BM25Okapi's epsilon floor uses."""
+    dfs = dfs[dfs > 0]
+    if not len(dfs):
+        return 0.0
+    return float(np.mean(np.log(n - dfs + 0.5) - np.log(dfs + 0.5)))
+
+
+def okapi_tf_part(tf: np.ndarray, doc_len: np.ndarray, avgdl: float) -> np.ndarray:
+    """The query-independent factor of one term's score; the contribution is idf times this."""
+    return tf * (K1 + 1) / (tf + K1 * (1 - B + B * doc_len / avgdl))
+
+
+def okapi_scores(scores: np.ndarray, docs: np.ndarray, tf: np.ndarray, doc_len: np.ndarray, avgdl: float, idf: float):
+    """Add one query term's contribution to `scores` for the rows in `docs`."""
+    scores[docs] += idf * okapi_tf_part(tf, doc_len, avgdl)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import os
+import hashlib
+import threading
+from time import monotonic
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from db.crud import fetch_scoring_columns
+from .embed import EMBED_BACKEND, EMBED_BATCH_SIZE, embed_documents, embed_query
+from .store import STORE_REFRESH_SECONDS, CorpusStore
+
+if TYPE_CHECKING:
+    import faiss
+
+# Dense side of hybrid search: one vector per document ("title category"),
+# embedded in batches at ingest time and saved next to the answer memory.
+# Queries only embed the query text itself.
+#
+# Documents with identical vectors (the same title apart from numbers is
+# common: "Circular No. 12/2019 regarding ...") share one FAISS entry, a
+# "group", so the index stays small and equal titles always score equally.
+# The file holds the serialized FAISS index plus the doc id -> group map and a
+# hash of each document's embedded text (so an edited title is re-embedded),
+# and is replaced atomically. One file per backend, so switching EMBED_BACKEND
+# never mixes vector spaces. faiss is imported where an index is built,
+# loaded or searched, so importing this module (and the API) stays cheap.
+DATA_DIR = os.getenv("DATA_DIR", "data")
+HYBRID_ENABLED = os.getenv("SEARCH_HYBRID_ENABLED", "true").lower() in ("1", "true", "yes")
+HYBRID_CANDIDATES = int(os.getenv("SEARCH_HYBRID_CANDIDATES", "100"))  # groups per query
+
+
+def title_index_path(backend: str = EMBED_BACKEND) -> str:
+    return os.path.join(DATA_DIR, f"titles_{backend}.npz")
+
+
+def _load(path: str) -> Tuple[faiss.Index, np.ndarray, np.ndarray]:
+    import faiss
+
+    with np.load(path) as f:
+        return faiss.deserialize_index(f["index"]), f["doc_ids"], f["groups"]
+
+
+def _text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def update_title_index(batch_size: int = EMBED_BATCH_SIZE, rebuild: bool = False) -> int:
+    """Embed documents that are new or whose title/category changed, and save the index.
+
+    Returns the number of documents embedded.
+    """
+    import faiss
+
+    path = title_index_path()
+    index, doc_ids, groups = None, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    hashes = np.empty(0, dtype=np.uint64)
+    if os.path.exists(path) and not rebuild:
+        index, doc_ids, groups = _load(path)
+        with np.load(path) as f:
+            # Files written before text hashes were kept: re-embed everything once
+            hashes = f["text_hashes"] if "text_hashes" in f.files else np.zeros(len(doc_ids), dtype=np.uint64)
+    known: Dict[bytes, int] = {}
+    if index is not None and index.ntotal:
+        known = {v.tobytes(): g for g, v in enumerate(index.reconstruct_n(0, index.ntotal))}
+    have = dict(zip(doc_ids.tolist(), hashes.tolist()))
+    cols = fetch_scoring_columns()
+    todo = []
+    for i, t, c in zip(cols.ids, cols.titles, cols.categories):
+        text = f"{t} {c}"
+        h = _text_hash(text)
+        if have.get(i) != h:
+            todo.append((i, text, h))
+    new_ids, new_groups = [], []
+    for start in range(0, len(todo), batch_size):
+        chunk = todo[start:start + batch_size]
+        vecs = embed_documents([text for _, text, _ in chunk])
+        if index is None:
+            index = faiss.IndexFlatIP(vecs.shape[1])  # inner product on normalized vectors = cosine
+        for (doc_id, _, _), vec in zip(chunk, vecs):
+            g = known.get(vec.tobytes())
+            if g is None:
+                g = known[vec.tobytes()] = index.ntotal
+                index.add(vec[None, :])
+            new_ids.append(doc_id)
+            new_groups.append(g)
+    if todo:
+        # Edited documents drop their old entry; its vector stays as a group no row maps to
+        keep = ~np.isin(doc_ids, np.asarray(new_ids, dtype=np.int64))
+        changed = len(doc_ids) - int(keep.sum())
+        os.makedirs(DATA_DIR, exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez(
+            tmp,
+            index=faiss.serialize_index(index),
+            doc_ids=np.concatenate([doc_ids[keep], np.asarray(new_ids, dtype=np.int64)]),
+            groups=np.concatenate([groups[keep], np.asarray(new_groups, dtype=np.int32)]),
+            text_hashes=np.concatenate([hashes[keep], np.asarray([h for _, _, h in todo], dtype=np.uint64)]),
+        )
+        os.replace(tmp, path)  # readers reopen on their next check
+        logger.info(
+            f"Title index: embedded {len(todo)} documents ({changed} changed, {EMBED_BACKEND}), "
+            f"{index.ntotal} distinct vectors"
+        )
+    return len(todo)
+
+
+class TitleIndex:
+    def __init__(self, index: faiss.Index, doc_ids: np.ndarray, groups: np.ndarray, file_key: Tuple):
+        self.index = index
+        order = np.argsort(doc_ids)
+        self.doc_ids = doc_ids[order]
+        self.groups = groups[order]
+        self.file_key = file_key
+        self._aligned: Optional[Tuple[CorpusStore, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def _align(self, store: CorpusStore) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Group of every store row (-1 if not embedded yet) and the rows of each group."""
+        aligned = self._aligned
+        if aligned is not None and aligned[0] is store:
+            return aligned[1:]
+        row_group = np.full(len(store), -1, dtype=np.int64)
+        if len(self.doc_ids):
+            pos = np.minimum(np.searchsorted(self.doc_ids, store.ids), len(self.doc_ids) - 1)
+            found = self.doc_ids[pos] == store.ids
+            row_group[found] = self.groups[pos[found]]
+        by_group = np.argsort(row_group, kind="stable")
+        offsets = np.searchsorted(row_group[by_group], np.arange(-1, self.index.ntotal + 1))
+        self._aligned = (store, row_group, by_group, offsets)
+        return row_group, by_group, offsets
+
+    def search_params(self, store: CorpusStore, mask: Optional[np.ndarray]) -> Optional[faiss.SearchParameters]:
+        """FAISS parameters restricting a search to the groups of the rows in `mask`."""
+        import faiss
+
+        if mask is None:
+            return None
+        row_group = self._align(store)[0]
+        allowed = np.unique(row_group[mask])
+        return faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed[allowed >= 0]))
+
+    def search(
+        self,
+        store: CorpusStore,
+        query: str,
+        k: int,
+        mask: Optional[np.ndarray] = None,
+        params: Optional[faiss.SearchParameters] = None,
+    ):
+        """(rows, cosine scores) of the rows in the k nearest groups, restricted to `mask`.
+
+        `params` from search_params(store, mask) can be reused across queries with the same mask.
+        """
+        row_group, by_group, offsets = self._align(store)
+        if params is None:
+            params = self.search_params(store, mask)
+        scores, groups = self.index.search(embed_query(query), k, params=params)
+        keep = groups[0] >= 0
+        scores, groups = scores[0][keep], groups[0][keep]
+        # offsets[g + 1]: start of group g (offsets[0] is the unembedded rows)
+        parts = [by_group[offsets[g + 1]:offsets[g + 2]] for g in groups]
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows = np.concatenate(parts)
+        row_scores = np.repeat(scores, [len(p) for p in parts])
+        if mask is not None:
+            keep = mask[rows]
+            rows, row_scores = rows[keep], row_scores[keep]
+        return rows, row_scores
+
+
+def _file_key(path: str) -> Optional[Tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+_index: Optional[TitleIndex] = None
+_checked_at: Optional[float] = None
+_index_lock = threading.Lock()
+
+
+def get_title_index() -> Optional[TitleIndex]:
+    """The saved title index (None until one was built), reopened when the file is replaced."""
+    global _index, _checked_at
+    if _checked_at is not None and monotonic() - _checked_at < STORE_REFRESH_SECONDS:
+        return _index
+    with _index_lock:
+        if _checked_at is None or monotonic() - _checked_at >= STORE_REFRESH_SECONDS:
+            path = title_index_path()
+            key = _file_key(path)
+            if key is None:
+                _index = None
+            elif _index is None or _index.file_key != key:
+                _index = TitleIndex(*_load(path), key)
+            _checked_at = monotonic()
+        return _index
+
+
+def invalidate():
+    global _checked_at
+    _checked_at = None
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import os
+import zlib
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from .text import analyze
+
+# Embeddings for the dense title index (search/dense.py):
+#   hashing  local, no model: signed feature hashing of words and their
+#            character trigrams, so "enrolment" and "enrolling" share most of
+#            their mass (morphology, partial words), but not synonyms
+#   gemini   llm.gemini_client.embed_texts (LLM_BACKEND=stub works offline)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "hashing").lower()
+EMBED_HASH_DIM = int(os.getenv("EMBED_HASH_DIM", "256"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+GRAM = 3
+_STOP = {"the", "of", "and", "for", "on", "in", "to", "a", "an", "at", "as", "by", "with", "no", "dated", "regarding"}
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vecs / norms).astype(np.float32)
+
+
+@lru_cache(maxsize=65536)
+def _token_features(token: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(buckets, signed weights) for one token: the word itself (0.5) plus its trigrams (1 in total).
+
+    Trigrams outweigh the exact word so other inflections stay close.
+    """
+    padded = f"^{token}$"
+    grams = [padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)]
+    keys = [f"w:{token}"] + [f"g:{g}" for g in grams]
+    h = np.array([zlib.crc32(k.encode("utf-8")) for k in keys], dtype=np.uint32)
+    weights = np.full(len(keys), 1.0 / len(grams), dtype=np.float32)
+    weights[0] = 0.5
+    weights[(h >> 31) == 1] *= -1  # top bit picks the sign, so collisions cancel out on average
+    return (h & 0x7FFFFFFF) % EMBED_HASH_DIM, weights
+
+
+def hashing_embed(texts: Sequence[str]) -> np.ndarray:
+    rows: List[np.ndarray] = []
+    buckets: List[np.ndarray] = []
+    weights: List[np.ndarray] = []
+    for i, text in enumerate(texts):
+        for tok in analyze(text):
+            if tok in _STOP or tok.isdigit():
+                continue
+            b, w = _token_features(tok)
+            rows.append(np.full(len(b), i, dtype=np.int64))
+            buckets.append(b)
+            weights.append(w)
+    out = np.zeros(len(texts) * EMBED_HASH_DIM, dtype=np.float32)
+    if rows:
+        flat = np.concatenate(rows) * EMBED_HASH_DIM + np.concatenate(buckets)
+        np.add.at(out, flat, np.concatenate(weights))
+    return _normalize(out.reshape(len(texts), EMBED_HASH_DIM))
+
+
+def embed_documents(texts: Sequence[str]) -> np.ndarray:
+    """(len(texts), dim) L2-normalized float32 vectors, one backend call per batch."""
+    if EMBED_BACKEND == "hashing":
+        return hashing_embed(texts)
+    if EMBED_BACKEND == "gemini":
+        from llm.gemini_client import embed_texts
+
+        return _normalize(np.asarray(embed_texts(list(texts)), dtype=np.float32))
+    raise ValueError(f"Unknown EMBED_BACKEND {EMBED_BACKEND!r} (hashing | gemini)")
+
+
+@lru_cache(maxsize=1024)
+def embed_query(text: str) -> np.ndarray:
+    vec = embed_documents([text])
+    vec.setflags(write=False)  # shared through the cache
+    return vec
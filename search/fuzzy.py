@@ -0,0 +1,106 @@
+from __future__ import annotations
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz
+
+from .strings import StringTable
+
+# Query terms are expanded to close vocabulary terms ("aadhar" -> "aadhaar")
+# through a character trigram index over the vocabulary, never by scanning
+# titles: a lookup touches only the terms sharing a trigram with the query term.
+FUZZY_MIN_RATIO = float(os.getenv("SEARCH_FUZZY_MIN_RATIO", "80"))  # rapidfuzz ratio, 0-100
+FUZZY_MAX_EXPANSIONS = int(os.getenv("SEARCH_FUZZY_MAX_EXPANSIONS", "3"))
+MIN_TERM_LEN = 4  # shorter terms and anything with digits match exactly only
+GRAM = 3
+_CANDIDATES = 20  # best trigram overlaps verified with rapidfuzz
+_CACHE_SIZE = 4096
+
+
+def _grams(term: str) -> List[str]:
+    padded = f"^{term}$"
+    return list({padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)})
+
+
+class TermIndex:
+    """Trigram -> term-id postings over a fixed vocabulary.
+
+    All flat arrays (see StringTable): the postings of gram `grams[g]` are
+    `gram_terms[gram_offsets[g]:gram_offsets[g + 1]]` and `n_grams[t]` is the
+    number of distinct grams of term t (0 for terms that never fuzzy match).
+    """
+
+    def __init__(
+        self,
+        terms: StringTable,
+        grams: StringTable,
+        gram_offsets: np.ndarray,
+        gram_terms: np.ndarray,
+        n_grams: np.ndarray,
+    ):
+        self.terms = terms
+        self.grams = grams
+        self.gram_offsets = gram_offsets
+        self.gram_terms = gram_terms
+        self.n_grams = n_grams
+        self._cache: Dict[str, List[Tuple[str, float]]] = {}
+
+    @classmethod
+    def build(cls, terms: StringTable) -> "TermIndex":
+        postings: Dict[str, List[int]] = {}
+        n_grams = np.zeros(len(terms), dtype=np.int32)
+        for i, term in enumerate(terms):
+            if len(term) < MIN_TERM_LEN or not term.isalpha():
+                continue
+            grams = _grams(term)
+            n_grams[i] = len(grams)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        grams = sorted(postings)
+        gram_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum([len(postings[g]) for g in grams], out=gram_offsets[1:])
+        gram_terms = np.fromiter(
+            (i for g in grams for i in postings[g]), dtype=np.int32, count=int(gram_offsets[-1])
+        )
+        return cls(terms, StringTable.build(grams), gram_offsets, gram_terms, n_grams)
+
+    @property
+    def nbytes(self) -> int:
+        return self.grams.nbytes + self.gram_offsets.nbytes + self.gram_terms.nbytes + self.n_grams.nbytes
+
+    def _postings(self, gram: str) -> Optional[np.ndarray]:
+        g = self.grams.get(gram)
+        return None if g is None else self.gram_terms[self.gram_offsets[g]:self.gram_offsets[g + 1]]
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """[(vocabulary term, weight)] for a query term; an exact hit weighs 1.0."""
+        hit = self._cache.get(term)
+        if hit is None:
+            hit = self._expand(term)
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.clear()
+            self._cache[term] = hit
+        return hit
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        out = [(term, 1.0)] if term in self.terms else []
+        if len(term) < MIN_TERM_LEN or not term.isalpha() or FUZZY_MAX_EXPANSIONS <= 0:
+            return out
+        grams = _grams(term)
+        hits = [p for p in map(self._postings, grams) if p is not None]
+        if not hits:
+            return out
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        dice = 2 * shared / (len(grams) + self.n_grams[ids])
+        best = ids[np.argsort(-dice, kind="stable")[:_CANDIDATES]]
+        scored = []
+        for i in best:
+            cand = self.terms[i]
+            if cand == term:
+                continue
+            ratio = fuzz.ratio(term, cand)
+            if ratio >= FUZZY_MIN_RATIO:
+                scored.append((ratio, cand))
+        scored.sort(key=lambda rc: -rc[0])
+        return out + [(cand, ratio / 100.0) for ratio, cand in scored[:FUZZY_MAX_EXPANSIONS]]
@@ -0,0 +1,290 @@
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from db.crud import corpus_version, fetch_scoring_columns
+from metrics.timing import timed
+from .bm25 import okapi_tf_part
+from .fuzzy import TermIndex
+from .store import CorpusStore, build_store
+from .strings import StringTable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The search store as one flat binary file that every API worker maps
+# read-only: the arrays are np.frombuffer views of the mapping, so N workers
+# share a single copy in the OS page cache instead of building N private ones.
+#
+#   magic, uint32 format version, uint32 header length   (16 bytes)
+#   JSON header: corpus version, categories, {array: dtype, count, offset}
+#   arrays, each starting on a 64-byte boundary
+#
+# A new snapshot is written to a temp file and renamed over the old one;
+# workers that still map the old file keep reading it until they notice the
+# change (inode) on their next store check, then map the new one.
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+_MAGIC = b"UIDAIIDX"
+FORMAT_VERSION = 1
+_HEAD = struct.Struct("<8sII")
+_ALIGN = 64
+
+
+def index_path() -> str:
+    return os.path.join(DATA_DIR, "search_index.bin")
+
+
+def version_key(version: Tuple) -> str:
+    return json.dumps(list(version), default=str)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _file_key(st: os.stat_result) -> Tuple:
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def file_key(path: str) -> Optional[Tuple]:
+    try:
+        return _file_key(os.stat(path))
+    except OSError:
+        return None
+
+
+class _BuildLock:
+    """Inter-process lock (flock / msvcrt.locking) held while the index file is rebuilt.
+
+    `with` yields whether it was acquired; with wait=False it gives up at once
+    when another process holds it. `error` is set when the lock file itself
+    cannot be created (e.g. DATA_DIR is not writable).
+    """
+
+    def __init__(self, path: str, wait: bool = True):
+        self.path = path
+        self.wait = wait
+        self.error: Optional[OSError] = None
+        self._f = None
+
+    def __enter__(self) -> bool:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._f = open(self.path, "a+b")
+        except OSError as e:
+            self.error = e
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_EX if self.wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK if self.wait else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            self._f.close()
+            self._f = None
+            return False
+        return True
+
+    def __exit__(self, *exc):
+        if self._f is None:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._f.close()
+            self._f = None
+        return False
+
+
+def _arrays(store: CorpusStore) -> Dict[str, np.ndarray]:
+    n = len(store)
+    post_part = store.post_part
+    if post_part is None:
+        # Unfiltered searches then skip the tf part (same values as BM25Subset computes)
+        avgdl = int(store.doc_len.sum()) / n if n else 0.0
+        post_part = okapi_tf_part(store.post_tf, store.doc_len[store.post_docs], avgdl) if n else np.empty(0)
+    out = {
+        "ids": store.ids,
+        "cluster_ids": store.cluster_ids,
+        "category_codes": store.category_codes,
+        "days": store.days,
+        "title_data": store.title_data,
+        "title_offsets": store.title_offsets,
+        "doc_len": store.doc_len,
+        "post_offsets": store.post_offsets,
+        "post_docs": store.post_docs,
+        "post_tf": store.post_tf,
+        "post_part": post_part,
+    }
+    for prefix, table in (("vocab", store.vocab), ("gram", store.terms.grams)):
+        out[f"{prefix}_data"] = table.data
+        out[f"{prefix}_offsets"] = table.offsets
+        if table.order is not None:
+            out[f"{prefix}_order"] = table.order
+    out["gram_post_offsets"] = store.terms.gram_offsets
+    out["gram_terms"] = store.terms.gram_terms
+    out["n_grams"] = store.terms.n_grams
+    return {name: np.ascontiguousarray(a) for name, a in out.items()}
+
+
+def write_index(store: CorpusStore, path: Optional[str] = None) -> str:
+    """Serialize `store` and atomically replace the index file with it."""
+    path = path or index_path()
+    arrays = _arrays(store)
+    layout: Dict[str, Dict[str, Any]] = {}
+    end = 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "count": len(a), "offset": end}
+        end = _aligned(end + a.nbytes)
+    header = json.dumps({
+        "version": version_key(store.version),
+        "categories": store.categories,
+        "arrays": layout,
+    }).encode("utf-8")
+    start = _aligned(_HEAD.size + len(header))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEAD.pack(_MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(start + layout[name]["offset"])
+            f.write(memoryview(a).cast("B"))
+        f.seek(start + end)
+        f.truncate()
+    os.replace(tmp, path)  # readers still mapping the old file are unaffected
+    return path
+
+
+def open_index(version: Tuple, path: Optional[str] = None) -> Optional[CorpusStore]:
+    """Map the index file; None when it is missing, unreadable or holds another corpus version."""
+    path = path or index_path()
+    try:
+        with open(path, "rb") as f:
+            key = _file_key(os.fstat(f.fileno()))  # of the file actually mapped, even if replaced meanwhile
+            magic, fmt, size = _HEAD.unpack(f.read(_HEAD.size))
+            if magic != _MAGIC or fmt != FORMAT_VERSION:
+                logger.warning(f"Ignoring search index {path}: not format {FORMAT_VERSION}")
+                return None
+            meta = json.loads(f.read(size))
+            if meta["version"] != version_key(version):
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = _aligned(_HEAD.size + size)
+
+        def arr(name: str) -> Optional[np.ndarray]:
+            spec = meta["arrays"].get(name)
+            if spec is None:
+                return None
+            return np.frombuffer(mm, dtype=np.dtype(spec["dtype"]), count=spec["count"], offset=start + spec["offset"])
+
+        vocab = StringTable(arr("vocab_data"), arr("vocab_offsets"), arr("vocab_order"))
+        return CorpusStore(
+            version=version,
+            ids=arr("ids"),
+            cluster_ids=arr("cluster_ids"),
+            category_codes=arr("category_codes"),
+            categories=meta["categories"],
+            days=arr("days"),
+            title_data=arr("title_data"),
+            title_offsets=arr("title_offsets"),
+            vocab=vocab,
+            terms=TermIndex(
+                vocab,
+                StringTable(arr("gram_data"), arr("gram_offsets"), arr("gram_order")),
+                arr("gram_post_offsets"),
+                arr("gram_terms"),
+                arr("n_grams"),
+            ),
+            doc_len=arr("doc_len"),
+            post_offsets=arr("post_offsets"),
+            post_docs=arr("post_docs"),
+            post_tf=arr("post_tf"),
+            post_part=arr("post_part"),
+            file_key=key,
+        )
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        logger.warning(f"Ignoring unreadable search index {path}: {e}")
+        return None
+
+
+def _header_version(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            magic, fmt, size = _HEAD.unpack(f.read(_HEAD.size))
+            if magic != _MAGIC or fmt != FORMAT_VERSION:
+                return None
+            return json.loads(f.read(size))["version"]
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+
+def load_store(version: Tuple, current: Optional[CorpusStore] = None) -> CorpusStore:
+    """The store for `version` mapped from the shared index file, rebuilding the file when stale.
+
+    One process rebuilds at a time; while it does, the others keep serving
+    `current`. If the file cannot be written, the store built here is served
+    from this process's memory instead.
+    """
+    path = index_path()
+    if current is not None and current.version == version:
+        if current.file_key is not None and current.file_key == file_key(path):
+            return current
+        # Same snapshot: switch to the shared file if there is one, never rebuild
+        return open_index(version, path) or current
+    store = open_index(version, path)
+    if store is not None:
+        return store
+    lock = _BuildLock(f"{path}.lock", wait=current is None)
+    with lock as locked:
+        if not locked and current is not None and lock.error is None:
+            return current  # another process is rebuilding it
+        if lock.error is not None:
+            logger.warning(f"Cannot write search index {path}: {lock.error}; serving this worker's own copy")
+        store = open_index(version, path) if locked else None  # written while we waited
+        if store is not None:
+            return store
+        with timed("store_build"):
+            store = build_store(fetch_scoring_columns(), version)
+        if not locked:
+            return store
+        try:
+            write_index(store, path)
+        except OSError as e:
+            # e.g. Windows refuses to replace a file other workers still map
+            logger.warning(f"Could not write search index {path}: {e}; serving this worker's own copy")
+            return store
+    return open_index(version, path) or store
+
+
+def write_search_index(path: Optional[str] = None, force: bool = False) -> str:
+    """Build the store from the DB and replace the shared index file unless it is current."""
+    path = path or index_path()
+    lock = _BuildLock(f"{path}.lock")
+    with lock as locked:
+        if not locked:
+            raise lock.error or OSError(f"Could not lock {path}.lock")
+        version = corpus_version()
+        if force or _header_version(path) != version_key(version):
+            with timed("store_build"):
+                write_index(build_store(fetch_scoring_columns(), version), path)
+            logger.info(f"Search index written: {path}")
+    return path
@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Exact top-k without scoring every row (MaxScore, term at a time). A query
+# term's upper bound is its largest contribution within the filtered rows.
+# With terms sorted by bound, the weakest ones whose bounds together (plus the
+# best recency) still fall short of the current k-th score are non-essential:
+# a row matching only those can never enter the top k. So only the essential
+# terms' postings are scored, plus rows recent enough to get there on
+# recency alone, and the top k is the same as after scoring every row.
+_SLACK = 1e-9  # bounds add up in another order than exact scores; never prune on rounding
+
+Postings = Sequence[Tuple[np.ndarray, np.ndarray]]  # (sorted rows, contribution) per term
+# (rows, scores) -> (ranked positions, score a row has to reach to change them)
+TopFn = Callable[[np.ndarray, np.ndarray], Tuple[np.ndarray, float]]
+CombineFn = Callable[[np.ndarray, np.ndarray], np.ndarray]  # (rows, raw sums) -> scores
+
+
+class MaxScore:
+    """One query's term postings; a row's raw score is the sum of its contributions in query order."""
+
+    def __init__(self, postings: Postings, n: int):
+        self.postings = [(d, c) for d, c in postings if len(d)]
+        self.n = n
+        self.bounds = np.array([float(c.max()) for _, c in self.postings])
+        self._size = sum(len(d) for d, _ in self.postings)
+        self._lookup = sum(np.log2(len(d) + 1) for d, _ in self.postings)  # binary search steps per row
+        self._rows = np.empty(0, dtype=np.int64)  # rows with a known raw score, sorted
+        self._raw = np.empty(0)
+        if len(self.postings) == 1:
+            # A single term's contributions are its rows' raw scores already
+            self._rows, self._raw = self.postings[0]
+        self._full: Optional[np.ndarray] = None
+        self._searched = np.empty(0, dtype=np.int64)
+
+    @property
+    def scored(self) -> int:
+        """Distinct rows any search() had to score."""
+        return len(self._searched)
+
+    def raw(self, rows: np.ndarray) -> np.ndarray:
+        """Raw scores of sorted unique `rows`; each is computed once."""
+        if not len(self._rows):
+            self._rows, self._raw = rows, self._sums(rows)
+            return self._raw
+        at = np.searchsorted(self._rows, rows)
+        known = self._rows[np.minimum(at, len(self._rows) - 1)] == rows
+        if known.all():
+            return self._raw[at]
+        new = rows[~known]
+        merged = np.concatenate((self._rows, new))
+        order = np.argsort(merged, kind="stable")
+        self._rows = merged[order]
+        self._raw = np.concatenate((self._raw, self._sums(new)))[order]
+        return self._raw[np.searchsorted(self._rows, rows)]
+
+    def _sums(self, rows: np.ndarray) -> np.ndarray:
+        # Same additions in the same order as CorpusStore.bm25, so bit-identical
+        if len(rows) * self._lookup > self._size:
+            if self._full is None:
+                self._full = np.zeros(self.n)
+                for d, c in self.postings:
+                    self._full[d] += c
+            return self._full[rows]
+        out = np.zeros(len(rows))
+        for d, c in self.postings:
+            i = np.minimum(np.searchsorted(d, rows), len(d) - 1)
+            hit = d[i] == rows
+            out[hit] += c[i[hit]]
+        return out
+
+    def search(
+        self,
+        top: TopFn,
+        combine: CombineFn,
+        scale: float,
+        k: int,
+        recency: Optional[Tuple[float, np.ndarray, np.ndarray]] = None,
+        budget: Optional[int] = None,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(rows scored, their scores, `top`'s ranked positions among them).
+
+        `combine` must never exceed scale * raw + weight * recency, with
+        `recency` = (weight, filtered rows most recent first, their recency).
+        Returns None as soon as more than `budget` rows would need scoring.
+        """
+        weight, rec_rows, rec_vals = recency if recency is not None else (0.0, None, None)
+        if rec_rows is None or not len(rec_rows):
+            weight = 0.0
+        by_bound = np.argsort(self.bounds, kind="stable")
+        # reach[j]: best score a row can get from the j weakest terms alone
+        reach = scale * np.concatenate(([0.0], np.cumsum(self.bounds[by_bound])))
+        rec_best = weight * rec_vals[0] if weight else 0.0
+        done = np.zeros(len(self.postings), dtype=bool)
+        frontier = min(k, len(rec_rows)) if weight else 0
+
+        seed: List[int] = [int(d[np.argmax(c)]) for d, c in self.postings]
+        if frontier:
+            seed.extend(rec_rows[:frontier].tolist())
+        rows = np.unique(np.asarray(seed, dtype=np.int64))
+        while True:
+            scores = combine(rows, self.raw(rows))
+            ranked, theta = top(rows, scores)
+            limit = theta - _SLACK * max(1.0, abs(theta))
+            weak = max(int(np.searchsorted(reach + rec_best, limit)) - 1, 0)
+            nxt = next((t for t in by_bound[weak:][::-1] if not done[t]), None)
+            if nxt is not None:
+                # Strongest essential term not scored yet
+                done[nxt] = True
+                new = self.postings[nxt][0]
+            elif weight:
+                # Rows outside the essential postings, best recency first
+                need = int(np.searchsorted(-rec_vals, -(limit - reach[weak]) / weight, side="right"))
+                if need <= frontier:
+                    break
+                grown = min(need, frontier + max(frontier, k))
+                new, frontier = rec_rows[frontier:grown], grown
+            else:
+                break
+            if budget is not None and len(rows) + len(new) > budget:
+                return None
+            rows = np.union1d(rows, new)
+        self._searched = np.union1d(self._searched, rows)
+        return rows, scores, ranked
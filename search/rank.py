@@ -1,69 +1,347 @@
 from __future__ import annotations
-from dataclasses import dataclass
+import os
+import threading
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from math import exp
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
 
 from .query_parser import parse_query, ParsedQuery
 from .filters import categories_for_query
-from .bm25 import BM25
-from db.crud import fetch_documents
+from .store import get_store
+from .dense import HYBRID_CANDIDATES, HYBRID_ENABLED
+from .maxscore import MaxScore
+from .text import analyze, stem
+from db.crud import fetch_documents_by_ids
+from metrics.timing import inc_counter, timed
 
 IST = ZoneInfo("Asia/Kolkata")
+# Show only the best-scoring member of each near-duplicate cluster (crawler/dedup.py)
+COLLAPSE_DUPLICATES = os.getenv("SEARCH_COLLAPSE_DUPLICATES", "true").lower() in ("1", "true", "yes")
+# Expand misspelled query terms to close vocabulary terms (search/fuzzy.py)
+FUZZY_ENABLED = os.getenv("SEARCH_FUZZY_ENABLED", "true").lower() in ("1", "true", "yes")
+# "maxscore" skips rows that provably cannot reach the top k (search/maxscore.py),
+# "exhaustive" scores every candidate row, "auto" prunes once a filter leaves at
+# least TOPK_MIN_ROWS rows (below that the bookkeeping costs more than it saves).
+# All modes return the same results.
+TOPK_MODE = os.getenv("SEARCH_TOPK_MODE", "auto").lower()
+TOPK_MIN_ROWS = int(os.getenv("SEARCH_TOPK_MIN_ROWS", "50000"))
 
-@dataclass
-class RankedDoc:
-    score: float
-    doc: Dict[str, Any]
+class ScoredDoc:
+    """A top-k winner before hydration."""
+    __slots__ = ("id", "score")
 
+    def __init__(self, id: int, score: float):
+        self.id = id
+        self.score = score
 
-def _tokenize(text: str) -> List[str]:
-    return [t.lower() for t in (text or "").split() if t]
 
+def _query_tokens(q: ParsedQuery) -> List[str]:
+    # Same analyzer as the indexed text (search/text.py)
+    return [stem(k) for k in q.keywords] or analyze(q.raw)
 
-def _normalize_scores(scores: List[float]) -> List[float]:
-    if not scores:
-        return []
-    mx = max(scores) or 1.0
-    return [s / mx for s in scores]
 
+def _expand(store, tokens: List[str]):
+    """Query tokens plus weighted typo expansions from the store's trigram index."""
+    if not FUZZY_ENABLED:
+        return tokens, None
+    terms: List[str] = []
+    weights: List[float] = []
+    for tok in tokens:
+        for term, weight in store.terms.expand(tok):
+            terms.append(term)
+            weights.append(weight)
+    return terms, weights
 
-def _recency_score(d) -> float:
-    if not d:
-        return 0.1  # small baseline if no date known
-    today = datetime.now(IST).date()
-    age_days = (today - d).days
-    if age_days < 0:
-        age_days = 0
-    half_life = 180.0  # ~6 months
-    return exp(-age_days / half_life)
 
+def _top_rows(scores: np.ndarray, rows: np.ndarray, top_k: int) -> np.ndarray:
+    # Same order as a stable descending sort over `rows` (ties keep id order);
+    # everything scoring at least the k-th best survives the partition.
+    sub = scores[rows]
+    if top_k < len(sub):
+        kth = np.partition(sub, len(sub) - top_k)[len(sub) - top_k]
+        keep = np.flatnonzero(sub >= kth)
+    else:
+        keep = np.arange(len(sub))
+    return rows[keep[np.argsort(-sub[keep], kind="stable")][:top_k]]
 
-def rank_documents(q: ParsedQuery, candidates: List[Dict[str, Any]], top_k: int = 10):
-    # Build BM25 corpus from title + category
-    corpus = [
-        _tokenize(f"{c.get('title','')} {c.get('category','')}") for c in candidates
-    ]
-    bm25 = BM25(corpus)
-    query_tokens = q.keywords or _tokenize(q.raw)
-    bm25_scores = _normalize_scores(bm25.get_scores(query_tokens))
 
-    # Recency component
-    rec_scores = [_recency_score(c.get("published_date")) for c in candidates]
+def _collapse(clusters: np.ndarray, scores: np.ndarray, rows: np.ndarray, top_k: int) -> List[int]:
+    """Walk rows best-first, keeping the first (best) row of each cluster."""
+    k = top_k * 2
+    while True:
+        seen = set()
+        out: List[int] = []
+        ranked = _top_rows(scores, rows, k)
+        for r in ranked:
+            cluster = clusters[r]
+            if cluster in seen:
+                continue
+            seen.add(cluster)
+            out.append(r)
+            if len(out) == top_k:
+                return out
+        if len(ranked) == len(rows):
+            return out
+        k *= 4  # too many duplicates near the top; look deeper
+
+
+RRF_K = 60
+
+
+def _dense_candidates(store, q: ParsedQuery, mask, group: Optional["_FilterGroup"] = None):
+    """(rows, cosine scores) of the nearest titles; None without a title index."""
+    from .dense import get_title_index
+
+    index = get_title_index()
+    if index is None:
+        return None
+    params = None
+    if group is not None:
+        if group.dense_params is None or group.dense_params[0] is not index:
+            group.dense_params = (index, index.search_params(store, mask))
+        params = group.dense_params[1]
+    return index.search(store, " ".join(q.keywords) or q.raw, HYBRID_CANDIDATES, mask, params)
+
+
+def _lexical_candidates(bm25_scores: np.ndarray, rows: np.ndarray):
+    """(rows, scores) of the best HYBRID_CANDIDATES BM25 matches, keeping rows tied with the last one."""
+    rows = rows[bm25_scores[rows] > 0]
+    sub = bm25_scores[rows]
+    if len(sub) > HYBRID_CANDIDATES:
+        kth = np.partition(sub, len(sub) - HYBRID_CANDIDATES)[len(sub) - HYBRID_CANDIDATES]
+        rows, sub = rows[sub >= kth], sub[sub >= kth]
+    return rows, sub
+
+
+def _rrf(n: int, *candidates) -> np.ndarray:
+    """Reciprocal rank fusion of (rows, scores) lists, scaled so the best row is 1.0.
+
+    Ranks count distinct scores, so equal scores share a rank and the many
+    identical titles never spread out by how their ties happened to be
+    ordered. Rows in no list get 0.
+    """
+    fused = np.zeros(n)
+    rows, scores = _rrf_sparse(*candidates)
+    fused[rows] = scores
+    return fused
+
+
+def _rrf_sparse(*candidates):
+    """_rrf over the rows that are in some list only: (sorted rows, fused scores)."""
+    rows, at = np.unique(np.concatenate([np.asarray(r, dtype=np.int64) for r, _ in candidates]), return_inverse=True)
+    fused = np.zeros(len(rows))
+    start = 0
+    for r, scores in candidates:
+        rank = np.unique(-scores, return_inverse=True)[1]
+        fused[at[start:start + len(r)]] += 1.0 / (RRF_K + 1 + rank)
+        start += len(r)
+    if len(fused):
+        fused /= fused.max() or 1.0
+    return rows, fused
+
+
+SCORE_BLOCK = 16  # queries blended per matrix operation (16 x corpus float64)
+ROWS_SCORED_HELP = "rows given a relevance score while ranking"
+
+
+class _FilterGroup:
+    """Work shared by the queries of a batch that filter the same way."""
+
+    def __init__(self, store, mask):
+        self.mask = mask
+        self.rows = np.arange(len(store)) if mask is None else np.flatnonzero(mask)
+        self.subset = store.subset(mask)
+        self.dense_params = None  # (title index, faiss params) once looked up
+        self._by_recency = None
+
+    def by_recency(self, store, today):
+        """(rows most recent first, their recency), for pruning on recency."""
+        if self._by_recency is None or self._by_recency[0] != today:
+            order = store.recency_order(today)
+            if self.mask is not None:
+                order = order[self.mask[order]]
+            self._by_recency = (today, order, store.recency(today)[order])
+        return self._by_recency[1:]
+
+
+# Filter groups outlive a request: the same few filters (none, a category, a
+# year) come back constantly. Kept per store snapshot, oldest dropped first.
+FILTER_CACHE_SIZE = int(os.getenv("SEARCH_FILTER_CACHE_SIZE", "32"))
+_groups: Dict[tuple, _FilterGroup] = {}
+_groups_store = None
+_groups_lock = threading.Lock()
+
 
-    # Weighting: favor recency when "latest" is requested
+def _filter_group(store, key: tuple) -> _FilterGroup:
+    global _groups_store
+    with _groups_lock:
+        if _groups_store is not store:
+            _groups.clear()
+            _groups_store = store
+        group = _groups.get(key)
+    if group is not None:
+        return group
+    cats, date_from, date_to = key
+    group = _FilterGroup(store, store.mask(cats, date_from, date_to))
+    with _groups_lock:
+        if _groups_store is store and FILTER_CACHE_SIZE > 0:
+            if len(_groups) >= FILTER_CACHE_SIZE:
+                _groups.pop(next(iter(_groups)))
+            _groups[key] = group
+    return group
+
+
+def _dense(store, q: ParsedQuery, group: _FilterGroup):
+    if not HYBRID_ENABLED:
+        return None
+    with timed("dense"):
+        return _dense_candidates(store, q, group.mask, group)
+
+
+def _relevance(store, q: ParsedQuery, group: _FilterGroup, dense) -> np.ndarray:
+    """BM25 (normalized to the best row), or its fusion with the `dense` title ranking."""
+    terms, weights = _expand(store, _query_tokens(q))
+    bm25_scores = store.bm25(terms, weights=weights, subset=group.subset)
+    bm25_scores /= float(bm25_scores[group.rows].max()) or 1.0
+    if dense is not None:
+        return _rrf(len(store), _lexical_candidates(bm25_scores, group.rows), dense)
+    return bm25_scores
+
+
+def _best_scores(k: int):
+    """Top function keeping the positive scores, pruning below the k-th best (ties kept)."""
+    def top(rows, scores):
+        pos = np.flatnonzero(scores > 0)
+        if len(pos) < k:
+            return pos, -np.inf
+        return pos, float(np.partition(scores[pos], len(pos) - k)[len(pos) - k])
+    return top
+
+
+def _winners(store, top_k: int):
+    """Top function ranking like the exhaustive path (_collapse or _top_rows)."""
+    def top(rows, scores):
+        pos = np.arange(len(rows))
+        if COLLAPSE_DUPLICATES:
+            ranked = np.asarray(_collapse(store.cluster_ids[rows], scores, pos, top_k), dtype=np.int64)
+        else:
+            ranked = _top_rows(scores, pos, top_k)
+        return ranked, float(scores[ranked[-1]]) if len(ranked) == top_k else -np.inf
+    return top
+
+
+# Past this share of the filtered rows, pruning bookkeeping costs more than
+# scoring every row; such queries fall back to the exhaustive path.
+PRUNE_MAX_SHARE = 0.125
+
+
+def _pruned_top(store, q: ParsedQuery, group: _FilterGroup, dense, today, top_k: int):
+    """(rows, scores) of the winners, scoring only rows that can still make the top k.
+
+    Same result as blending _relevance with recency over every row: the BM25
+    maximum (for normalizing) and, in hybrid mode, the lexical candidates
+    are found by MaxScore first, then the final top k with recency bounded
+    by the filter's most recent row. None when too many rows can't be ruled out.
+    """
+    budget = int(len(group.rows) * PRUNE_MAX_SHARE)
+    if dense is not None and len(dense[0]) > budget:
+        return None
+    terms, weights = _expand(store, _query_tokens(q))
+    lexical = MaxScore(group.subset.term_scores(terms, weights), len(store))
+    k = 1 if dense is None else HYBRID_CANDIDATES
+    found = lexical.search(_best_scores(k), lambda r, x: x, 1.0, k, budget=budget)
+    if found is None:
+        inc_counter("uidai_search_rows_scored_total", lexical.scored, ROWS_SCORED_HELP)
+        return None
+    rows, raw, _ = found
+    norm = float(raw.max()) if len(raw) else 0.0
+    norm = norm or 1.0
     alpha = 0.4 if q.want_latest else 0.7
-    combined = [alpha * b + (1 - alpha) * r for b, r in zip(bm25_scores, rec_scores)]
+    rec_scores = store.recency(today)
+    if dense is not None:
+        pos, lex_scores = _lexical_candidates(raw / norm, np.arange(len(rows)))
+        final = MaxScore([_rrf_sparse((rows[pos], lex_scores), dense)], len(store))
+        combine, scale = (lambda r, x: alpha * x + (1 - alpha) * rec_scores[r]), alpha
+    else:
+        final = lexical
+        combine, scale = (lambda r, x: alpha * (x / norm) + (1 - alpha) * rec_scores[r]), alpha / norm
+    found = final.search(
+        _winners(store, top_k), combine, scale, top_k, (1 - alpha, *group.by_recency(store, today)), budget
+    )
+    inc_counter("uidai_search_rows_scored_total", lexical.scored + (final.scored if final is not lexical else 0), ROWS_SCORED_HELP)
+    if found is None:
+        return None
+    rows, scores, ranked = found
+    return rows[ranked], scores[ranked]
 
-    ranked = sorted(zip(combined, candidates), key=lambda x: x[0], reverse=True)
-    return [
-        {**c, "score": round(s, 6)} for s, c in ranked[: top_k]
-    ]
+
+def results_version() -> tuple:
+    """Everything besides the query that search results depend on; changes whenever they may."""
+    from .dense import get_title_index
+
+    index = get_title_index() if HYBRID_ENABLED else None
+    return get_store().version, index.file_key if index is not None else None, datetime.now(IST).date()
 
 
 def search_ranked_documents(query_text: str, top_k: int = 10):
-    q = parse_query(query_text)
-    cats = categories_for_query(q)
-    candidates = fetch_documents(categories=cats, date_from=q.date_from, date_to=q.date_to, limit=None)
-    return rank_documents(q, candidates, top_k=top_k)
\ No newline at end of file
+    return search_ranked_documents_batch([query_text], top_k=top_k)[0]
+
+
+def search_ranked_documents_batch(query_texts: Sequence[str], top_k: int = 10) -> List[List[Dict[str, Any]]]:
+    """Ranked documents for each query, the same as one search_ranked_documents call per query.
+
+    Queries are grouped by filter (categories and date window from the query
+    text); a group builds its candidate mask, BM25 statistics and each term's
+    postings once, and blends recency into all its queries' scores a block at
+    a time (or, when TOPK_MODE prunes, scores only rows that can still reach
+    the top k). The winners of every query are hydrated in one DB round trip.
+    """
+    with timed("parse_query"):
+        parsed = {text: parse_query(text) for text in dict.fromkeys(query_texts)}
+        by_filter: Dict[tuple, List[str]] = {}
+        for text, q in parsed.items():
+            cats = categories_for_query(q)
+            by_filter.setdefault((tuple(sorted(cats or ())), q.date_from, q.date_to), []).append(text)
+    # Phase 1: score against the in-memory columnar store
+    store = get_store()
+    today = datetime.now(IST).date()
+    rec_scores = store.recency(today)
+    top: Dict[str, List[ScoredDoc]] = {}
+    for key, texts in by_filter.items():
+        with timed("filter"):
+            group = _filter_group(store, key)
+        if not len(group.rows):
+            top.update((text, []) for text in texts)
+            continue
+        with timed("score"):
+            dense = {text: _dense(store, parsed[text], group) for text in texts}
+            if TOPK_MODE == "maxscore" or (TOPK_MODE == "auto" and len(group.rows) >= TOPK_MIN_ROWS):
+                rest = []
+                for text in texts:
+                    found = _pruned_top(store, parsed[text], group, dense[text], today, top_k)
+                    if found is None:
+                        rest.append(text)
+                    else:
+                        top[text] = [ScoredDoc(int(store.ids[r]), float(s)) for r, s in zip(*found)]
+                texts = rest
+            inc_counter("uidai_search_rows_scored_total", len(group.rows) * len(texts), ROWS_SCORED_HELP)
+            for start in range(0, len(texts), SCORE_BLOCK):
+                block = texts[start:start + SCORE_BLOCK]
+                relevance = np.stack([_relevance(store, parsed[text], group, dense[text]) for text in block])
+                alpha = np.array([[0.4 if parsed[text].want_latest else 0.7] for text in block])
+                combined = alpha * relevance + (1 - alpha) * rec_scores
+                for text, scores in zip(block, combined):
+                    if COLLAPSE_DUPLICATES:
+                        winners = _collapse(store.cluster_ids, scores, group.rows, top_k)
+                    else:
+                        winners = _top_rows(scores, group.rows, top_k)
+                    top[text] = [ScoredDoc(int(store.ids[r]), float(scores[r])) for r in winners]
+    # Phase 2: hydrate full rows for the winners only
+    with timed("hydrate"):
+        docs = {d["id"]: d for d in fetch_documents_by_ids(list({t.id for ts in top.values() for t in ts}))}
+    return [
+        [{**docs[t.id], "score": round(t.score, 6)} for t in top[text] if t.id in docs]
+        for text in query_texts
+    ]
@@ -0,0 +1,303 @@
+from __future__ import annotations
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from time import monotonic
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from db.crud import ScoringColumns, corpus_version, fetch_scoring_columns
+from metrics.timing import timed
+from .bm25 import EPSILON, okapi_average_idf, okapi_idf, okapi_tf_part
+from .fuzzy import TermIndex
+from .strings import StringTable
+from .text import analyze
+
+# How often a worker re-checks the corpus version (one cheap aggregate query)
+STORE_REFRESH_SECONDS = float(os.getenv("SEARCH_STORE_REFRESH_SECONDS", "5"))
+# Serve the store from one memory-mapped file shared by all workers (search/index_file.py)
+INDEX_MMAP = os.getenv("SEARCH_INDEX_MMAP", "true").lower() in ("1", "true", "yes")
+
+NO_DATE = np.iinfo(np.int32).min  # day number stored for a missing published_date
+HALF_LIFE_DAYS = 180.0
+NO_DATE_RECENCY = 0.1
+
+
+@dataclass(eq=False)
+class CorpusStore:
+    """Columnar, read-only snapshot of the searchable corpus.
+
+    Row i across all arrays is one document, rows ordered by id. Instead of a
+    dict per row, strings are interned (categories) or packed into one table
+    (titles), dates are day ordinals and the BM25 corpus is kept as postings:
+    for term t, `post_docs[post_offsets[t]:post_offsets[t + 1]]` are the rows
+    containing it and `post_tf` the matching term frequencies.
+
+    Every field is a flat array (or a StringTable of them), so the same store
+    can be served from one memory-mapped index file (search/index_file.py)
+    that all API workers share; its arrays are then read-only.
+    """
+    version: Tuple = ()
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    cluster_ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))  # own id if unclustered
+    category_codes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+    categories: List[Optional[str]] = field(default_factory=list)
+    days: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    title_data: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.uint8))  # utf-8, titles back to back
+    title_offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    vocab: StringTable = field(default_factory=lambda: StringTable.build(()))  # term -> term id
+    terms: TermIndex = field(default_factory=lambda: TermIndex.build(StringTable.build(())))  # trigrams, for typos
+    doc_len: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    post_offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    post_docs: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    post_tf: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+    post_part: Optional[np.ndarray] = None  # okapi_tf_part of post_tf over all rows, precomputed in index files
+    file_key: Optional[Tuple] = None  # index file this store is mapped from, None when built in memory
+    _recency: Optional[Tuple[date, np.ndarray]] = field(default=None, repr=False)
+    _recency_order: Optional[Tuple[date, np.ndarray]] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def title(self, row: int) -> str:
+        return self.title_data[self.title_offsets[row]:self.title_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def category(self, row: int) -> Optional[str]:
+        return self.categories[self.category_codes[row]]
+
+    def published_date(self, row: int) -> Optional[date]:
+        d = int(self.days[row])
+        return None if d == NO_DATE else date.fromordinal(d)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.ids, self.cluster_ids, self.category_codes, self.days, self.title_data, self.title_offsets,
+                  self.doc_len, self.post_offsets, self.post_docs, self.post_tf)
+        extra = self.post_part.nbytes if self.post_part is not None else 0
+        return sum(a.nbytes for a in arrays) + self.vocab.nbytes + self.terms.nbytes + extra
+
+    def mask(
+        self,
+        categories: Optional[Sequence[str]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> Optional[np.ndarray]:
+        """Boolean row mask with the same semantics as crud._document_filters; None = all rows."""
+        m = None
+        if categories:
+            wanted = set(categories)
+            codes = [i for i, c in enumerate(self.categories) if c in wanted]
+            m = np.isin(self.category_codes, codes)
+        if date_from:
+            # NO_DATE is below every real ordinal, so NULL dates drop out like in SQL
+            m = _and(m, self.days >= date_from.toordinal())
+        if date_to:
+            m = _and(m, (self.days <= date_to.toordinal()) & (self.days != NO_DATE))
+        return m
+
+    def subset(self, mask: Optional[np.ndarray] = None) -> "BM25Subset":
+        return BM25Subset(self, mask)
+
+    def bm25(
+        self,
+        query_tokens: Sequence[str],
+        mask: Optional[np.ndarray] = None,
+        weights: Optional[Sequence[float]] = None,
+        subset: Optional["BM25Subset"] = None,
+    ) -> np.ndarray:
+        """BM25Okapi scores of the rows selected by `mask` (other rows are 0).
+
+        Statistics (N, avgdl, df, average idf) are taken over the selected rows
+        only, exactly as if BM25Okapi had been built on that subset. `weights`
+        scales each query token's contribution (fuzzy expansions weigh < 1).
+        Pass the same `subset` (instead of `mask`) for queries sharing a filter
+        to compute those statistics and per-term postings once.
+        """
+        sub = subset if subset is not None else self.subset(mask)
+        scores = np.zeros(len(self))
+        for docs, contribution in sub.term_scores(query_tokens, weights):
+            scores[docs] += contribution
+        return scores
+
+    def _document_frequencies(self, mask: Optional[np.ndarray]) -> np.ndarray:
+        if mask is None:
+            return np.diff(self.post_offsets)
+        if not len(self.post_docs):
+            return np.empty(0, dtype=np.int64)
+        # Every term has at least one posting, so no reduceat segment is empty
+        return np.add.reduceat(mask[self.post_docs].astype(np.int64), self.post_offsets[:-1])
+
+    def recency(self, today: date) -> np.ndarray:
+        """exp(-age / half-life) per row, 0.1 for rows without a date (cached per day)."""
+        cached = self._recency
+        if cached is not None and cached[0] == today:
+            return cached[1]
+        out = np.full(len(self), NO_DATE_RECENCY)
+        dated = self.days != NO_DATE
+        if not dated.any():
+            return out
+        days = self.days[dated]
+        lo = int(days.min())
+        # math.exp over the distinct ages only; same values as the per-row version
+        table = np.array([
+            math.exp(-max(0, today.toordinal() - d) / HALF_LIFE_DAYS) for d in range(lo, int(days.max()) + 1)
+        ])
+        out[dated] = table[days - lo]
+        self._recency = (today, out)
+        return out
+
+    def recency_order(self, today: date) -> np.ndarray:
+        """Rows from most to least recent, ties in row order (cached per day)."""
+        cached = self._recency_order
+        if cached is None or cached[0] != today:
+            cached = self._recency_order = (today, np.argsort(-self.recency(today), kind="stable"))
+        return cached[1]
+
+
+class BM25Subset:
+    """BM25 statistics of the rows one mask selects, filled in as terms are looked up."""
+
+    def __init__(self, store: CorpusStore, mask: Optional[np.ndarray] = None):
+        self.store = store
+        self.mask = mask
+        self.n = len(store) if mask is None else int(np.count_nonzero(mask))
+        self.avgdl = int(store.doc_len.sum() if mask is None else store.doc_len[mask].sum()) / self.n if self.n else 0.0
+        self._eps: Optional[float] = None
+        self._postings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def postings(self, t: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, okapi_tf_part) of term id t within the subset."""
+        hit = self._postings.get(t)
+        if hit is None:
+            st = self.store
+            lo, hi = st.post_offsets[t], st.post_offsets[t + 1]
+            docs, tf = st.post_docs[lo:hi], st.post_tf[lo:hi]
+            if self.mask is None and st.post_part is not None:
+                return self._postings.setdefault(t, (docs, st.post_part[lo:hi]))
+            if self.mask is not None:
+                keep = self.mask[docs]
+                docs, tf = docs[keep], tf[keep]
+            hit = self._postings[t] = (docs, okapi_tf_part(tf, st.doc_len[docs], self.avgdl))
+        return hit
+
+    def term_scores(
+        self, query_tokens: Sequence[str], weights: Optional[Sequence[float]] = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(rows, idf * tf part) per query token that matches, in query order; their sum is BM25."""
+        out: List[Tuple[np.ndarray, np.ndarray]] = []
+        if not self.n:
+            return out
+        for q, tok in enumerate(query_tokens):
+            t = self.store.vocab.get(tok)
+            if t is None:
+                continue
+            docs, part = self.postings(t)
+            if not len(docs):
+                continue
+            idf = okapi_idf(self.n, len(docs))
+            if idf < 0:
+                # Floored to epsilon * average idf over the subset's vocabulary
+                idf = self.eps()
+            if idf == 0:
+                continue
+            if weights is not None:
+                idf *= weights[q]
+            out.append((docs, idf * part))
+        return out
+
+    def eps(self) -> float:
+        if self._eps is None:
+            self._eps = EPSILON * okapi_average_idf(self.n, self.store._document_frequencies(self.mask))
+        return self._eps
+
+
+def _and(a: Optional[np.ndarray], b: np.ndarray) -> np.ndarray:
+    return b if a is None else a & b
+
+
+def build_store(cols: ScoringColumns, version: Tuple = ()) -> CorpusStore:
+    n = len(cols)
+    if not n:
+        return CorpusStore(version=version)
+
+    ids = np.fromiter(cols.ids, dtype=np.int64, count=n)
+    cluster_ids = np.fromiter(
+        (c if c is not None else i for i, c in zip(cols.ids, cols.cluster_ids or (None,) * n)), dtype=np.int64, count=n
+    )
+    interned: Dict[Optional[str], int] = {}
+    category_codes = np.fromiter(
+        (interned.setdefault(c, len(interned)) for c in cols.categories), dtype=np.int16, count=n
+    )
+    days = np.fromiter(
+        (d.toordinal() if d else NO_DATE for d in cols.published_dates), dtype=np.int32, count=n
+    )
+
+    encoded = [(t or "").encode("utf-8") for t in cols.titles]
+    title_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=title_offsets[1:])
+
+    # The BM25 "document" of a row is its title plus category
+    vocab: Dict[str, int] = {}
+    doc_len = np.empty(n, dtype=np.int32)
+    flat: List[int] = []
+    for i, (t, c) in enumerate(zip(cols.titles, cols.categories)):
+        toks = analyze(f"{t} {c}")
+        doc_len[i] = len(toks)
+        flat.extend(vocab.setdefault(w, len(vocab)) for w in toks)
+
+    # (term, row) pairs sorted term-major; counts of repeats are the tfs
+    rows = np.repeat(np.arange(n, dtype=np.int64), doc_len)
+    pairs, tf = np.unique(np.asarray(flat, dtype=np.int64) * n + rows, return_counts=True)
+    terms = pairs // n
+    post_offsets = np.searchsorted(terms, np.arange(len(vocab) + 1)).astype(np.int64)
+    vocab_table = StringTable.build(list(vocab))  # same term ids
+
+    return CorpusStore(
+        version=version,
+        ids=ids,
+        cluster_ids=cluster_ids,
+        category_codes=category_codes,
+        categories=list(interned),
+        days=days,
+        title_data=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        title_offsets=title_offsets,
+        vocab=vocab_table,
+        terms=TermIndex.build(vocab_table),
+        doc_len=doc_len,
+        post_offsets=post_offsets,
+        post_docs=(pairs % n).astype(np.int32),
+        post_tf=tf.astype(np.int16),
+    )
+
+
+_store: Optional[CorpusStore] = None
+_checked_at: Optional[float] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> CorpusStore:
+    """The current corpus snapshot, rebuilt (or remapped) when the DB's corpus version changes."""
+    global _store, _checked_at
+    if _store is not None and _checked_at is not None and monotonic() - _checked_at < STORE_REFRESH_SECONDS:
+        return _store
+    with _store_lock:
+        if _store is None or _checked_at is None or monotonic() - _checked_at >= STORE_REFRESH_SECONDS:
+            version = corpus_version()
+            if INDEX_MMAP:
+                from .index_file import load_store
+
+                _store = load_store(version, _store)
+            elif _store is None or _store.version != version:
+                with timed("store_build"):
+                    _store = build_store(fetch_scoring_columns(), version)
+            _checked_at = monotonic()
+        return _store
+
+
+def invalidate():
+    """Force the next get_store() to re-check the corpus version (call after writes)."""
+    global _checked_at
+    _checked_at = None
@@ -0,0 +1,79 @@
+from __future__ import annotations
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+_CACHE_SIZE = 4096
+_MISS = object()
+
+
+class StringTable:
+    """Read-only list of strings packed into flat arrays, with dict-style lookups.
+
+    `data` holds the utf-8 strings back to back and string i is
+    `data[offsets[i]:offsets[i + 1]]`. `order` lists the indexes in sorted
+    (byte) order, or is None when the strings are sorted already, so `get`
+    is a binary search. Plain arrays, so a table works the same whether it was
+    built in memory or is a view of a memory-mapped file.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, order: Optional[np.ndarray] = None):
+        self.data = data
+        self.offsets = offsets
+        self.order = order
+        self._cache: Dict[str, Optional[int]] = {}  # hot lookups, per process
+
+    @classmethod
+    def build(cls, strings: Sequence[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        order = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)
+        if np.array_equal(order, np.arange(len(encoded))):
+            order = None
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets, order)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._bytes(int(i)).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+    def __contains__(self, s: str) -> bool:
+        return self.get(s) is not None
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.offsets.nbytes + (self.order.nbytes if self.order is not None else 0)
+
+    def get(self, s: str, default: Optional[int] = None) -> Optional[int]:
+        """Index of `s`, or `default` when it is not in the table."""
+        # One lookup: another request thread may clear the cache in between
+        hit = self._cache.get(s, _MISS)
+        if hit is _MISS:
+            hit = self._find(s.encode("utf-8"))
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.clear()
+            self._cache[s] = hit
+        return default if hit is None else hit
+
+    def _bytes(self, i: int) -> bytes:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def _at(self, pos: int) -> int:
+        return pos if self.order is None else int(self.order[pos])
+
+    def _find(self, key: bytes) -> Optional[int]:
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(self._at(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._bytes(self._at(lo)) == key:
+            return self._at(lo)
+        return None
@@ -0,0 +1,216 @@
+from __future__ import annotations
+import threading
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from metrics.timing import timed
+from .rank import IST, COLLAPSE_DUPLICATES
+from .store import CorpusStore, get_store
+from .text import words
+
+MAX_SUGGESTIONS = 20
+PRECOMPUTED_PREFIX_CHARS = 2  # answers for 1-2 letter prefixes are kept ready-made
+_SCAN_CHUNK = 2048  # rows tested per step when every prefix of a query is common
+_MAX_CHAR = "\U0010ffff"
+
+
+class SuggestIndex:
+    """Sorted-array prefix index over title words of one CorpusStore snapshot.
+
+    `vocab` is the sorted distinct title words; the rows containing vocab[i]
+    are ranks[offsets[i]:offsets[i + 1]], stored as recency ranks (0 = most
+    recent, same ordering as CorpusStore.recency) in ascending order. All
+    words sharing a prefix are adjacent, so a prefix maps to one contiguous
+    range of words, and the best rows are found from each word's first
+    MAX_SUGGESTIONS ranks (`heads`) without touching the rest of its postings.
+    """
+
+    def __init__(self, store: CorpusStore, today: date):
+        self.store = store
+        self.version = store.version
+        self.today = today
+        n = len(store)
+        # Best first: most recent, then newest id
+        self.order = np.lexsort((-store.ids, -store.recency(today))).astype(np.int32)
+
+        by_word: Dict[str, List[int]] = {}
+        for r, row in enumerate(self.order.tolist()):  # rank order, so postings come out sorted
+            for w in set(words(store.title(row))):
+                by_word.setdefault(w, []).append(r)
+        self.vocab = sorted(by_word)
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum([len(by_word[w]) for w in self.vocab], out=self.offsets[1:])
+        self.ranks = np.fromiter(
+            (r for w in self.vocab for r in by_word[w]), dtype=np.int32, count=int(self.offsets[-1])
+        )
+        # heads[i]: first ranks of word i padded with n; cutoff[i]: its first rank
+        # left out of heads (n if none), below which heads are complete
+        self.heads = np.full((len(self.vocab), MAX_SUGGESTIONS), n, dtype=np.int32)
+        self.cutoff = np.full(len(self.vocab), n, dtype=np.int32)
+        for i, w in enumerate(self.vocab):
+            ranks = by_word[w]
+            self.heads[i, :min(len(ranks), MAX_SUGGESTIONS)] = ranks[:MAX_SUGGESTIONS]
+            if len(ranks) > MAX_SUGGESTIONS:
+                self.cutoff[i] = ranks[MAX_SUGGESTIONS]
+
+        # The word ids of each row, in rank order, to test candidates against prefixes
+        word_ids = {w: i for i, w in enumerate(self.vocab)}
+        row_words = [[word_ids[w] for w in set(words(store.title(row)))] for row in self.order.tolist()]
+        self.rank_word_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(ws) for ws in row_words], out=self.rank_word_offsets[1:])
+        self.rank_words = np.fromiter(
+            (i for ws in row_words for i in ws), dtype=np.int32, count=int(self.rank_word_offsets[-1])
+        )
+
+        self._short: Dict[str, List[int]] = {}
+        for prefix in sorted({w[:k] for w in self.vocab for k in range(1, PRECOMPUTED_PREFIX_CHARS + 1)}):
+            self._short[prefix] = self._prefix_best(prefix, MAX_SUGGESTIONS)
+
+    def _word_range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self.vocab, prefix)
+        return lo, bisect_left(self.vocab, prefix + _MAX_CHAR, lo)
+
+    def _best(self, ranks: np.ndarray, limit: int, out: Optional[List[int]] = None, seen=None) -> List[int]:
+        """Rows for sorted unique `ranks`, one per near-duplicate cluster, best first.
+
+        Pass the same `out` and `seen` to continue a walk over later ranks.
+        """
+        out = [] if out is None else out
+        seen = set() if seen is None else seen
+        if len(out) >= limit:
+            return out
+        for r in ranks.tolist():
+            row = int(self.order[r])
+            cluster = int(self.store.cluster_ids[row])
+            if COLLAPSE_DUPLICATES and cluster in seen:
+                continue
+            seen.add(cluster)
+            out.append(row)
+            if len(out) == limit:
+                break
+        return out
+
+    def _prefix_best(self, prefix: str, limit: int) -> List[int]:
+        lo, hi = self._word_range(prefix)
+        if lo == hi:
+            return []
+        # Every rank below the cutoff is in some head, so walking the heads gives
+        # the exact answer as long as it fills up before reaching the cutoff
+        cutoff = int(self.cutoff[lo:hi].min())
+        heads = self.heads[lo:hi].ravel()
+        best = self._best(np.unique(heads[heads < cutoff]), limit)
+        if len(best) == limit or cutoff == len(self.store):
+            return best
+        return self._best(np.unique(self.ranks[self.offsets[lo]:self.offsets[hi]]), limit)
+
+    def lookup(self, text: str, limit: int = 10) -> List[int]:
+        """Rows whose title has a word starting with each word of `text`."""
+        terms = words(text)
+        if not terms:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        if len(terms) == 1:
+            hit = self._short.get(terms[0])
+            return hit[:limit] if hit is not None else self._prefix_best(terms[0], limit)
+        ranges = [self._word_range(t) for t in terms]
+        sizes = [int(self.offsets[hi] - self.offsets[lo]) for lo, hi in ranges]
+        if not min(sizes):
+            return []
+        n = len(self.store)
+        lo, hi = ranges[sizes.index(min(sizes))]
+        if min(sizes) <= _SCAN_CHUNK:
+            chunks = [np.unique(self.ranks[self.offsets[lo]:self.offsets[hi]])]
+        else:
+            # Every prefix is common: scan rows best first, usually only the first chunk
+            chunks = (np.arange(start, min(start + _SCAN_CHUNK, n)) for start in range(0, n, _SCAN_CHUNK))
+        out: List[int] = []
+        seen: set = set()
+        for ranks in chunks:
+            self._best(ranks[self._matches(ranks, ranges)], limit, out, seen)
+            if len(out) == limit:
+                break
+        return out
+
+    def _matches(self, ranks: np.ndarray, ranges: List[Tuple[int, int]]) -> np.ndarray:
+        """For each rank, whether its title has a word in every [lo, hi) word range."""
+        starts = self.rank_word_offsets[ranks]
+        lens = self.rank_word_offsets[ranks + 1] - starts
+        ends = np.cumsum(lens)
+        # Positions of all the candidates' word ids in rank_words, back to back
+        pos = np.arange(int(ends[-1]) if len(ends) else 0) + np.repeat(starts - (ends - lens), lens)
+        ids = self.rank_words[pos]
+        ok = np.ones(len(ranks), dtype=bool)
+        for lo, hi in ranges:
+            hits = np.concatenate(([0], np.cumsum((ids >= lo) & (ids < hi))))
+            ok &= hits[ends] > hits[ends - lens]
+        return ok
+
+    def suggestion(self, row: int) -> Dict[str, Any]:
+        return {
+            "id": int(self.store.ids[row]),
+            "title": self.store.title(row),
+            "category": self.store.category(row),
+            "published_date": self.store.published_date(row),
+        }
+
+
+_index: Optional[SuggestIndex] = None
+_index_lock = threading.Lock()
+_rebuilding = False
+
+
+def get_suggest_index() -> SuggestIndex:
+    """Index over the current store; rebuilt when the corpus version (or the day) changes.
+
+    Only the first index is built inline (warm-up does it). Later rebuilds run
+    on a background thread while the previous index keeps answering.
+    """
+    global _index
+    store = get_store()
+    today = datetime.now(IST).date()
+    idx = _index
+    if idx is not None and idx.store is store and idx.today == today:
+        return idx
+    if idx is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build(store, today)
+            return _index
+    _rebuild_in_background(store, today)
+    return idx
+
+
+def _build(store: CorpusStore, today: date) -> SuggestIndex:
+    with timed("suggest_build"):
+        return SuggestIndex(store, today)
+
+
+def _rebuild_in_background(store: CorpusStore, today: date):
+    global _rebuilding
+    with _index_lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=_rebuild, args=(store, today), name="suggest-build", daemon=True).start()
+
+
+def _rebuild(store: CorpusStore, today: date):
+    global _index, _rebuilding
+    try:
+        idx = _build(store, today)
+        with _index_lock:
+            _index = idx
+    except Exception:
+        logger.exception("Suggest index rebuild failed; serving the previous one")
+    finally:
+        with _index_lock:
+            _rebuilding = False
+
+
+def suggest_titles(prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    idx = get_suggest_index()
+    return [idx.suggestion(row) for row in idx.lookup(prefix, limit)]
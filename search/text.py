@@ -0,0 +1,30 @@
+from __future__ import annotations
+import re
+from typing import List
+
+# One analyzer for both sides of the index: document text when the search
+# store is built and query keywords at search time, so "Regulations," in a
+# title and "regulation" in a query end up as the same term.
+_SPLIT = re.compile(r"[^\w]+")
+
+
+def stem(token: str) -> str:
+    """Light plural stemmer (Harman's S-stemmer); leaves short words and numbers alone."""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and not token.endswith(("eies", "aies")):
+        return token[:-3] + "y"
+    if token.endswith("es") and not token.endswith(("aes", "ees", "oes")):
+        return token[:-1]
+    if token.endswith("s") and not token.endswith(("us", "ss")):
+        return token[:-1]
+    return token
+
+
+def words(text: str) -> List[str]:
+    """Lowercased words, punctuation dropped, no stemming (prefix matching)."""
+    return [t for t in _SPLIT.split((text or "").lower()) if t]
+
+
+def analyze(text: str) -> List[str]:
+    return [stem(t) for t in words(text)]
@@ -0,0 +1,142 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.admission import PRIORITIES, AdmissionController, Overloaded
+
+
+def _blocker():
+    """A sync job that runs until released, recording how many run at once."""
+    gate = threading.Event()
+    state = {"running": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def job(name, order=None):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            if order is not None:
+                order.append(name)
+        gate.wait(5)
+        with lock:
+            state["running"] -= 1
+        return name
+
+    return gate, state, job
+
+
+async def _until(cond, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_concurrency_is_bounded():
+    gate, state, job = _blocker()
+    ctl = AdmissionController("t_bound", 2, 10, 5)
+
+    async def scenario():
+        tasks = [asyncio.create_task(ctl.run(job, i)) for i in range(5)]
+        await _until(lambda: state["running"] == 2 and ctl.queued == 3)
+        gate.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+    assert state["peak"] == 2
+    ctl.shutdown()
+
+
+def test_waiters_run_by_priority_then_arrival():
+    gate, _, job = _blocker()
+    ctl = AdmissionController("t_priority", 1, 10, 5)
+    order = []
+
+    async def scenario():
+        first = asyncio.create_task(ctl.run(job, "first", order))
+        await _until(lambda: order == ["first"])
+        tasks = []
+        for name, priority in [("low", "low"), ("normal-1", "normal"), ("high", "high"), ("normal-2", "normal")]:
+            tasks.append(asyncio.create_task(ctl.run(job, name, order, priority=PRIORITIES[priority])))
+            await _until(lambda: ctl.queued == len(tasks))
+        gate.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(scenario())
+    assert order == ["first", "high", "normal-1", "normal-2", "low"]
+    ctl.shutdown()
+
+
+def test_full_queue_and_queue_timeout_are_rejected():
+    gate, state, job = _blocker()
+    ctl = AdmissionController("t_reject", 1, 1, 0.1)
+
+    async def scenario():
+        running = asyncio.create_task(ctl.run(job, "running"))
+        await _until(lambda: state["running"] == 1)
+        waiting = asyncio.create_task(ctl.run(job, "waiting"))
+        await _until(lambda: ctl.queued == 1)
+        with pytest.raises(Overloaded) as full:
+            await ctl.run(job, "rejected")
+        with pytest.raises(Overloaded) as timed_out:
+            await waiting
+        gate.set()
+        await running
+        return full.value, timed_out.value
+
+    full, timed_out = asyncio.run(scenario())
+    assert full.reason == "queue full" and full.retry_after >= 1
+    assert timed_out.reason == "queue timeout" and timed_out.retry_after >= 1
+    ctl.shutdown()
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_work_finishes():
+    gate, state, job = _blocker()
+    ctl = AdmissionController("t_cancel", 1, 10, 5)
+
+    async def scenario():
+        caller = asyncio.create_task(ctl.run(job, "abandoned"))
+        await _until(lambda: state["running"] == 1)
+        caller.cancel()  # client disconnected; the thread keeps running
+        nxt = asyncio.create_task(ctl.run(job, "next"))
+        await asyncio.sleep(0.05)
+        assert state["running"] == 1 and ctl.queued == 1
+        gate.set()
+        return await nxt
+
+    assert asyncio.run(scenario()) == "next"
+    assert state["peak"] == 1
+    ctl.shutdown()
+
+
+def test_answer_returns_429_with_retry_after(monkeypatch):
+    gate, state, _ = _blocker()
+
+    def build_answer(query, memory, top_k):
+        state["running"] += 1
+        gate.wait(5)
+        return {"content": "ok", "source_site": "uidai.gov.in", "documents": []}
+
+    ctl = AdmissionController("t_http", 1, 0, 5)
+    monkeypatch.setattr(main, "answer_admission", ctl)
+    monkeypatch.setattr(main, "build_answer", build_answer)
+    monkeypatch.setattr(main, "get_memory", lambda: None)
+    client = TestClient(main.app)
+    first = {}
+    t = threading.Thread(target=lambda: first.update(r=client.post("/answer", json={"query": "aadhaar"})))
+    t.start()
+    deadline = time.monotonic() + 5
+    while state["running"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    r = client.post("/answer", json={"query": "aadhaar"})
+    gate.set()
+    t.join(5)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    assert first["r"].status_code == 200
+    ctl.shutdown()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from crawler.dedup import cluster_titles, normalize_title
+
+
+def test_normalize_title_drops_case_punctuation_and_noise_words():
+    assert normalize_title("The Aadhaar (Enrolment and Update) Regulations, 2016 - Updated") == \
+        "aadhaar enrolment and update regulations 2016"
+    assert normalize_title(None) == ""
+
+
+def test_identical_and_near_duplicate_titles_share_the_smallest_id():
+    clusters = cluster_titles(
+        [7, 3, 9, 4],
+        [
+            "Aadhaar (Authentication) Regulations, 2016",
+            "The Aadhaar Authentication Regulations 2016",
+            "Aadhar Authentication Regulations, 2016",  # typo: MinHash/LSH path
+            "Aadhaar (Authentication and Offline Verification) Regulations, 2021",
+        ],
+    )
+    assert clusters[7] == clusters[9] == 3
+    assert clusters[3] == 3
+    assert clusters[4] == 4
+
+
+def test_titles_differing_in_number_or_instrument_stay_apart():
+    clusters = cluster_titles(
+        [1, 2, 3, 4],
+        [
+            "Aadhaar (Enrolment and Update) Regulations, 2016",
+            "Aadhaar (Enrolment and Update) Regulations, 2017",
+            "Aadhaar (Enrolment and Update) Rules, 2016",
+            "Aadhaar (Enrolment and Update) Regulations, 2016",
+        ],
+    )
+    assert clusters == {1: 1, 2: 2, 3: 3, 4: 1}
+
+
+def test_empty_titles_are_singletons():
+    assert cluster_titles([1, 2, 3], ["", "  ", "Circular"]) == {1: 1, 2: 2, 3: 3}
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pytest
+
+import search.fuzzy as fuzzy
+from search.fuzzy import TermIndex
+from search.strings import StringTable
+from search.text import analyze, stem, words
+
+VOCAB = ["aadhaar", "address", "addresses", "authentication", "authority", "biometric", "card", "regulation", "2016"]
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("regulations", "regulation"),
+    ("agencies", "agency"),
+    ("charges", "charge"),
+    ("address", "address"),  # -ss
+    ("status", "status"),  # -us
+    ("companies", "company"),
+    ("bus", "bus"),  # short words are left alone
+    ("2016s", "2016s"),  # not alphabetic
+])
+def test_stem(token, expected):
+    assert stem(token) == expected
+
+
+def test_analyze_matches_query_and_title_forms():
+    assert words("Aadhaar (Enrolment) Regulations, 2016") == ["aadhaar", "enrolment", "regulations", "2016"]
+    assert analyze("Regulations,") == analyze("regulation") == ["regulation"]
+
+
+def test_string_table_lookup_in_any_order():
+    table = StringTable.build(["zeta", "alpha", "mid", "ädhar"])
+    assert [table.get(s) for s in ("zeta", "alpha", "mid", "ädhar", "missing")] == [0, 1, 2, 3, None]
+    assert list(table) == ["zeta", "alpha", "mid", "ädhar"]
+    assert "mid" in table and "mi" not in table
+
+
+@pytest.fixture
+def index():
+    return TermIndex.build(StringTable.build(VOCAB))
+
+
+def test_expand_exact_term(index):
+    assert index.expand("aadhaar")[0] == ("aadhaar", 1.0)
+
+
+def test_expand_typo_to_close_terms(index):
+    out = dict(index.expand("aadhar"))
+    assert "aadhaar" in out and 0.8 <= out["aadhaar"] < 1.0
+    assert "authentication" in dict(index.expand("authentcation"))
+    assert index.expand("adress")[0][0] == "address"
+
+
+def test_expand_is_exact_only_for_short_terms_and_numbers(index):
+    assert index.expand("crd") == []
+    assert index.expand("card") == [("card", 1.0)]
+    assert index.expand("2016") == [("2016", 1.0)]
+    assert index.expand("2015") == []
+
+
+def test_expand_caps_expansions(index, monkeypatch):
+    monkeypatch.setattr(fuzzy, "FUZZY_MAX_EXPANSIONS", 1)
+    assert len(TermIndex.build(StringTable.build(VOCAB)).expand("addresss")) == 1
+    monkeypatch.setattr(fuzzy, "FUZZY_MAX_EXPANSIONS", 0)
+    assert TermIndex.build(StringTable.build(VOCAB)).expand("aadhar") == []
+
+
+def test_expand_ignores_unrelated_terms(index):
+    assert index.expand("xylophone") == []
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import json
+
+import numpy as np
+import pytest
+
+import llm.memory as memory
+import llm.stub_client as stub
+import scripts.backfill_answers as backfill
+from llm.memory import AnswerMemory
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    """Point the answer store at a temp dir, with offline embeddings."""
+    paths = {
+        "VEC_PATH": str(tmp_path / "answers.vec"),
+        "META_PATH": str(tmp_path / "answers_meta.jsonl"),
+        "INDEX_PATH": str(tmp_path / "answers.faiss"),
+    }
+    monkeypatch.setattr(memory, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(memory, "LOCK_PATH", str(tmp_path / "answers.lock"))
+    monkeypatch.setattr(memory.FileLock.__init__, "__defaults__", (str(tmp_path / "answers.lock"),))
+    for name, path in paths.items():
+        monkeypatch.setattr(memory, name, path)
+        monkeypatch.setattr(backfill, name, path)
+    monkeypatch.setattr(stub, "STUB_EMBED_DIM", 16)
+    monkeypatch.setattr(memory, "embed_text", lambda text: stub.embed_texts([text])[0])
+    monkeypatch.setattr(backfill, "embed_texts", stub.embed_texts)
+    return tmp_path
+
+
+def _vector(text: str) -> np.ndarray:
+    return np.asarray(stub.embed_texts([text])[0], dtype="float32")
+
+
+def _answers(mem: AnswerMemory):
+    return {i: m.answer for i, m in mem.meta.items()}
+
+
+def test_readers_tail_rows_appended_by_another_writer():
+    writer, reader = AnswerMemory(), AnswerMemory()
+    assert reader.search_similar("anything") == []
+    writer.add_answer("q0", "answer zero", [1])
+    writer.add_answer("q1", "answer one", [2])
+    hits = reader.search_similar("answer one", k=1)
+    assert hits[0]["answer"] == "answer one" and hits[0]["doc_ids"] == [2]
+    assert reader.index.ntotal == 2 and _answers(reader) == {0: "answer zero", 1: "answer one"}
+    offset = reader._meta_offset
+    writer.add_answer("q2", "answer two", [3])
+    reader.refresh()
+    assert reader.index.ntotal == 3 and reader._meta_offset > offset  # only the new row was read
+
+
+def test_reload_after_backfill_swap():
+    writer = AnswerMemory()
+    for q, a in [("q0", "a0"), ("q1", "a1"), ("q0", "a0"), ("q2", "a2"), ("q1", "a1")]:
+        writer.add_answer(q, a, [])
+    reader = AnswerMemory()
+    assert reader.index.ntotal == 5
+
+    assert backfill.rebuild(batch_size=2, workers=2) == 3  # duplicates dropped
+    reader.refresh()
+    assert reader.index.ntotal == 3 and _answers(reader) == {0: "a0", 1: "a1", 2: "a2"}
+    for i, answer in _answers(reader).items():
+        assert np.allclose(reader.index.reconstruct(i), _vector(answer), atol=1e-6)
+
+    # The old writer reloads too, so its next idx follows the rebuilt store
+    assert writer.add_answer("q3", "a3", []) == 3
+    reader.refresh()
+    assert _answers(reader)[3] == "a3"
+    assert np.allclose(reader.index.reconstruct(3), _vector("a3"), atol=1e-6)
+
+
+def test_backfill_keeps_answers_added_during_the_rebuild(monkeypatch):
+    writer = AnswerMemory()
+    for i in range(4):
+        writer.add_answer(f"q{i}", f"a{i}", [])
+    calls = []
+
+    def embed_and_answer(texts):
+        # An API worker answers while the rebuild is embedding
+        if not calls:
+            AnswerMemory().add_answer("late", "late answer", [])
+        calls.append(texts)
+        return stub.embed_texts(texts)
+
+    monkeypatch.setattr(backfill, "embed_texts", embed_and_answer)
+    assert backfill.rebuild(batch_size=10, workers=1) == 5
+    reader = AnswerMemory()
+    assert sorted(_answers(reader).values()) == ["a0", "a1", "a2", "a3", "late answer"]
+    assert reader.index.ntotal == 5
+
+
+def test_append_after_torn_writes_keeps_rows_aligned():
+    writer = AnswerMemory()
+    for i in range(3):
+        writer.add_answer(f"q{i}", f"a{i}", [])
+    # A writer crashed part-way: half a vector row, a meta line whose vector
+    # was never written and half a meta line
+    with open(memory.VEC_PATH, "ab") as f:
+        f.write(b"\0" * 10)
+    with open(memory.META_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"idx": 3, "question": "x", "answer": "orphan", "doc_ids": [], "created_at": ""}) + "\n")
+        f.write('{"idx": 4, "quest')
+
+    reader = AnswerMemory()
+    assert reader.index.ntotal == 3 and 3 not in reader.meta
+    assert AnswerMemory().add_answer("q3", "a3", []) == 3
+    reader.refresh()
+    fresh = AnswerMemory()
+    for mem in (reader, fresh):
+        assert _answers(mem) == {0: "a0", 1: "a1", 2: "a2", 3: "a3"}
+        assert np.allclose(mem.index.reconstruct(3), _vector("a3"), atol=1e-6)
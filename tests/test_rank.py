@@ -0,0 +1,123 @@
+from __future__ import annotations
+import random
+from datetime import date, timedelta
+
+import faiss
+import numpy as np
+import pytest
+
+import search.dense as dense
+import search.rank as rank
+from db.crud import ScoringColumns
+from search.embed import embed_documents
+from search.store import build_store
+
+WORDS = (
+    "aadhaar enrolment update authentication biometric demographic resident registrar agency "
+    "offline verification ekyc mobile address proof identity virtual card letter privacy "
+    "security data sharing grievance redressal fee charges operator supervisor centre audit "
+    "compliance licence suspension penalty appeal tribunal notification amendment procedure "
+    "children infant photograph iris fingerprint face consent seeding bank subsidy welfare"
+).split()
+CATEGORIES = ("Circulars", "Notifications", "Regulations", "Rules", "Updated Regulations")
+QUERIES = (
+    "aadhaar update",
+    "biometric authentication",
+    "latest circulars on enrolment",
+    "offline verification regulations",
+    "ekyc since 2021",
+    "penalty before 2019",
+    "notifications in 2020",
+    "updated regulations on fee charges",
+    "adress proof",  # typo, expanded to "address"
+    "authentcation",
+    "recent resident data sharing",
+    "grievance",
+    "xyzzy",
+)
+
+
+def _documents(n: int = 3000, seed: int = 7):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(1, n + 1):
+        if i % 9 == 0:
+            # Near-duplicate of the previous document, same cluster
+            prev = docs[-1]
+            docs.append({**prev, "id": i, "cluster_id": prev["cluster_id"]})
+            continue
+        published = None if rng.random() < 0.05 else date(2016, 1, 1) + timedelta(days=rng.randrange(3500))
+        docs.append({
+            "id": i,
+            "title": " ".join(rng.sample(WORDS, rng.randint(3, 8))).capitalize(),
+            "category": rng.choice(CATEGORIES),
+            "published_date": published,
+            "cluster_id": i,
+        })
+    return docs
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    docs = _documents()
+    cols = ScoringColumns(
+        ids=tuple(d["id"] for d in docs),
+        titles=tuple(d["title"] for d in docs),
+        categories=tuple(d["category"] for d in docs),
+        published_dates=tuple(d["published_date"] for d in docs),
+        cluster_ids=tuple(d["cluster_id"] for d in docs),
+    )
+    store = build_store(cols, version=(len(docs),))
+    vecs = embed_documents([f"{d['title']} {d['category']}" for d in docs])
+    index = faiss.IndexFlatIP(vecs.shape[1])
+    index.add(vecs)
+    titles = dense.TitleIndex(index, np.asarray(cols.ids, dtype=np.int64), np.arange(len(docs), dtype=np.int32), ())
+    return store, titles, {d["id"]: d for d in docs}
+
+
+@pytest.fixture
+def search(corpus, monkeypatch):
+    store, titles, by_id = corpus
+    monkeypatch.setattr(rank, "get_store", lambda: store)
+    monkeypatch.setattr(rank, "fetch_documents_by_ids", lambda ids: [by_id[i] for i in ids])
+    monkeypatch.setattr(dense, "get_title_index", lambda: titles)
+    monkeypatch.setattr(rank, "PRUNE_MAX_SHARE", 1.0)  # always take the pruned path in maxscore mode
+
+    def run(mode: str, hybrid: bool, collapse: bool, k: int):
+        monkeypatch.setattr(rank, "TOPK_MODE", mode)
+        monkeypatch.setattr(rank, "HYBRID_ENABLED", hybrid)
+        monkeypatch.setattr(rank, "COLLAPSE_DUPLICATES", collapse)
+        return [[(d["id"], d["score"]) for d in rank.search_ranked_documents(q, k)] for q in QUERIES]
+
+    return run
+
+
+@pytest.mark.parametrize("hybrid", [False, True])
+@pytest.mark.parametrize("collapse", [False, True])
+@pytest.mark.parametrize("k", [1, 6, 25])
+def test_maxscore_matches_exhaustive(search, hybrid, collapse, k):
+    exhaustive = search("exhaustive", hybrid, collapse, k)
+    assert any(exhaustive)
+    assert search("maxscore", hybrid, collapse, k) == exhaustive
+
+
+def test_maxscore_scores_fewer_rows(search):
+    from metrics.timing import counter_value
+
+    before = counter_value("uidai_search_rows_scored_total")
+    search("exhaustive", False, True, 6)
+    exhaustive = counter_value("uidai_search_rows_scored_total") - before
+    search("maxscore", False, True, 6)
+    pruned = counter_value("uidai_search_rows_scored_total") - before - exhaustive
+    assert 0 < pruned < exhaustive
+
+
+@pytest.mark.parametrize("mode", ["exhaustive", "maxscore"])
+@pytest.mark.parametrize("hybrid", [False, True])
+def test_batch_matches_single_queries(search, monkeypatch, mode, hybrid):
+    search(mode, hybrid, True, 1)  # sets the mode
+    # Duplicates and queries with different (and shared) filters, in mixed order
+    qs = list(QUERIES) + ["aadhaar update", "grievance", "circulars", "ekyc since 2021", "aadhaar update"]
+    random.Random(3).shuffle(qs)
+    for k in (1, 10):
+        assert rank.search_ranked_documents_batch(qs, top_k=k) == [rank.search_ranked_documents(q, k) for q in qs]
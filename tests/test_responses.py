@@ -0,0 +1,86 @@
+from __future__ import annotations
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import api.main as main
+from api.responses import etag, not_modified
+
+
+def _request(if_none_match=None) -> Request:
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "method": "POST", "path": "/search", "headers": headers})
+
+
+def test_etag_is_weak_and_depends_on_every_part():
+    tag = etag("aadhaar", 10, (3, "2026-01-01"))
+    assert tag.startswith('W/"') and tag.endswith('"')
+    assert tag == etag("aadhaar", 10, (3, "2026-01-01"))
+    assert tag != etag("aadhaar", 11, (3, "2026-01-01"))
+    assert tag != etag("aadhaar", 10, (4, "2026-01-01"))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('W/"abc"', True),
+    ('"abc"', True),  # weak comparison
+    ('"x", W/"abc"', True),
+    ("*", True),
+    ('W/"abd"', False),
+])
+def test_not_modified(header, expected):
+    assert not_modified(_request(header), 'W/"abc"') is expected
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+    version = [(1, "2026-01-15")]
+
+    def search(query, top_k):
+        calls.append(query)
+        return [
+            {"id": i, "title": f"{query} document {i} " + "x" * 200, "category": "Circulars",
+             "published_date": date(2024, 1, i + 1), "score": 1.0 / (i + 1), "cluster_id": i}
+            for i in range(top_k)
+        ]
+
+    monkeypatch.setattr(main, "search_ranked_documents", search)
+    monkeypatch.setattr(main, "results_version", lambda: version[0])
+    return TestClient(main.app), calls, version
+
+
+def test_search_answers_304_for_a_matching_etag(client):
+    http, calls, version = client
+    body = {"query": "aadhaar update", "top_k": 3}
+    first = http.post("/search", json=body)
+    assert first.status_code == 200
+    tag = first.headers["ETag"]
+    docs = first.json()["results"]
+    assert [d["id"] for d in docs] == [0, 1, 2] and docs[0]["published_date"] == "2024-01-01"
+    assert "cluster_id" not in docs[0]
+
+    again = http.post("/search", json=body, headers={"If-None-Match": tag})
+    assert again.status_code == 304 and again.headers["ETag"] == tag and not again.content
+    assert len(calls) == 1  # nothing was searched
+
+    assert http.post("/search", json={**body, "top_k": 4}, headers={"If-None-Match": tag}).status_code == 200
+    version[0] = (2, "2026-01-15")  # new corpus snapshot
+    changed = http.post("/search", json=body, headers={"If-None-Match": tag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != tag
+
+
+def test_gzip_and_identity_share_the_etag(client):
+    http, _, _ = client
+    body = {"query": "aadhaar update", "top_k": 10}
+    plain = http.post("/search", json=body, headers={"Accept-Encoding": "identity"})
+    gz = http.post("/search", json=body, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.headers["ETag"] == plain.headers["ETag"]
+    assert gz.json() == plain.json()
+    r = http.post("/search", json=body, headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]})
+    assert r.status_code == 304
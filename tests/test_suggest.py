@@ -0,0 +1,122 @@
+from __future__ import annotations
+import random
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+import search.suggest as suggest
+from db.crud import ScoringColumns
+from search.store import build_store
+from search.suggest import SuggestIndex
+from search.text import words
+
+TODAY = date(2026, 1, 15)
+WORDS = (
+    "aadhaar aadhar address authentication authority biometric card centre charges circular "
+    "demographic ekyc enrolment fee grievance identity infant mobile notification offline "
+    "penalty privacy regulation resident update verification"
+).split()
+PREFIXES = (
+    "a", "au", "aad", "aadhaar", "b", "ce", "zz",
+    "aadhaar up", "up aa", "a a", "au b", "en fee", "off ver", "c c c", "aadhaar zzz",
+    "Aadhaar, Update!", "",
+)
+
+
+def _store(n: int = 2000, seed: int = 5):
+    rng = random.Random(seed)
+    titles, dates, clusters = [], [], []
+    for i in range(1, n + 1):
+        if i % 7 == 0:
+            # Near-duplicate of the previous document, same cluster
+            titles.append(titles[-1])
+            dates.append(dates[-1])
+            clusters.append(clusters[-1])
+            continue
+        titles.append(" ".join(rng.sample(WORDS, rng.randint(2, 6))).title())
+        dates.append(None if rng.random() < 0.1 else TODAY - timedelta(days=rng.randrange(3000)))
+        clusters.append(i)
+    cols = ScoringColumns(
+        ids=tuple(range(1, n + 1)),
+        titles=tuple(titles),
+        categories=tuple(rng.choice(("Circulars", "Rules")) for _ in range(n)),
+        published_dates=tuple(dates),
+        cluster_ids=tuple(clusters),
+    )
+    return build_store(cols, version=(n, seed))
+
+
+def _expected(store, text: str, limit: int, collapse: bool):
+    """Brute force: rows whose title has a word starting with each query word, best first."""
+    terms = words(text)
+    if not terms:
+        return []
+    recency = store.recency(TODAY)
+    out, seen = [], set()
+    for row in sorted(range(len(store)), key=lambda r: (-recency[r], -int(store.ids[r]))):
+        title = words(store.title(row))
+        if not all(any(w.startswith(t) for w in title) for t in terms):
+            continue
+        cluster = int(store.cluster_ids[row])
+        if collapse and cluster in seen:
+            continue
+        seen.add(cluster)
+        out.append(row)
+        if len(out) == min(limit, suggest.MAX_SUGGESTIONS):
+            break
+    return out
+
+
+@pytest.fixture(scope="module")
+def store():
+    return _store()
+
+
+@pytest.mark.parametrize("collapse", [False, True])
+@pytest.mark.parametrize("scan_chunk", [2048, 64])  # 64: the chunked scan for common prefixes
+def test_lookup_matches_brute_force(store, monkeypatch, collapse, scan_chunk):
+    monkeypatch.setattr(suggest, "COLLAPSE_DUPLICATES", collapse)
+    monkeypatch.setattr(suggest, "_SCAN_CHUNK", scan_chunk)
+    index = SuggestIndex(store, TODAY)
+    for text in PREFIXES:
+        for limit in (1, 10, 50):
+            assert index.lookup(text, limit) == _expected(store, text, limit, collapse), (text, limit)
+
+
+def test_suggestion_fields(store):
+    index = SuggestIndex(store, TODAY)
+    row = index.lookup("aadhaar", 1)[0]
+    s = index.suggestion(row)
+    assert s["id"] == int(store.ids[row])
+    assert s["title"] == store.title(row) and "aadhaar" in words(s["title"])
+    assert s["category"] in ("Circulars", "Rules")
+
+
+def test_stale_index_is_served_while_rebuilding(monkeypatch):
+    old, new = _store(200, seed=1), _store(300, seed=2)
+    current = [old]
+    monkeypatch.setattr(suggest, "get_store", lambda: current[0])
+    monkeypatch.setattr(suggest, "_index", None)
+    first = suggest.get_suggest_index()  # built inline
+    assert first.store is old
+
+    release, built = threading.Event(), threading.Event()
+
+    class SlowIndex(SuggestIndex):
+        def __init__(self, *args):
+            release.wait(5)
+            super().__init__(*args)
+            built.set()
+
+    monkeypatch.setattr(suggest, "SuggestIndex", SlowIndex)
+    current[0] = new
+    assert suggest.get_suggest_index() is first  # old index while the new one builds
+    assert suggest.get_suggest_index() is first
+    release.set()
+    assert built.wait(5)
+    for _ in range(100):
+        if suggest.get_suggest_index() is not first:
+            break
+        threading.Event().wait(0.01)
+    assert suggest.get_suggest_index().store is new